@@ -54,6 +54,18 @@ class ActionModule(ActionBase):
           'type': 'str',
           'default': None,
         },
+        'helper': {
+          'type': 'bool',
+          'default': False,
+        },
+        'helper_idle': {
+          'type': 'int',
+          'default': 300,
+        },
+        'helper_dir': {
+          'type': 'path',
+          'default': None,
+        },
       },
     )
 
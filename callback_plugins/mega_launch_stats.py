@@ -0,0 +1,208 @@
+# Copyright © 2022 Dmitrii Sukhodoev <raven428@gmail.com>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+DOCUMENTATION = r'''
+---
+name: mega_launch_stats
+type: aggregate
+short_description: fleet summary of service launch timings
+description:
+  - collect results of mega_launch, mega_status and check_service tasks per host
+  - print time-to-ready percentiles, rescue distribution and slowest hosts
+  - sum per-phase timings when modules provide them
+requirements:
+  - enable in callbacks_enabled configuration
+options:
+  json_path:
+    description: write fleet summary as JSON to this path
+    type: path
+    env:
+      - name: MEGA_LAUNCH_STATS_JSON
+    ini:
+      - section: callback_mega_launch_stats
+        key: json_path
+  slowest:
+    description: number of slowest hosts in the summary
+    type: int
+    default: 10
+    env:
+      - name: MEGA_LAUNCH_STATS_SLOWEST
+    ini:
+      - section: callback_mega_launch_stats
+        key: slowest
+'''
+
+import json
+import math
+import time
+
+# pylint: disable=import-error
+from ansible.plugins.callback import (  # type: ignore[reportMissingImports]
+  CallbackBase,
+)
+
+TRACKED_ACTIONS = ('mega_launch', 'mega_status', 'check_service')
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values: list[float], rank: int) -> float:
+  ordered = sorted(values)
+  return ordered[max(math.ceil(rank / 100 * len(ordered)) - 1, 0)]
+
+
+class CallbackModule(CallbackBase):
+  CALLBACK_VERSION = 2.0
+  CALLBACK_TYPE = 'aggregate'
+  CALLBACK_NAME = 'mega_launch_stats'
+  CALLBACK_NEEDS_ENABLED = True
+
+  def __init__(self) -> None:
+    super().__init__()
+    self.hosts: dict[str, dict] = {}
+    self.started: dict[str, float] = {}
+
+  @staticmethod
+  def tracked(task) -> bool:  # noqa: ANN001
+    return task.action.split('.')[-1] in TRACKED_ACTIONS
+
+  def host_stats(self, host: str) -> dict:
+    return self.hosts.setdefault(host, {
+      'first_start': None,
+      'last_end': None,
+      'time_to_ready': None,
+      'downtime': None,
+      'rescues': 0,
+      'failed': False,
+      'phases': {},
+    })
+
+  def v2_runner_on_start(self, host, task) -> None:  # noqa: ANN001
+    if self.tracked(task):
+      stats = self.host_stats(host.get_name())
+      if stats['first_start'] is None:
+        stats['first_start'] = time.time()
+
+  def record(self, result, failed: bool) -> None:  # noqa: ANN001,FBT001
+    if not self.tracked(result._task):  # noqa: SLF001
+      return
+    data = result._result  # noqa: SLF001
+    if data.get('ansible_job_id') and not data.get('finished'):
+      return
+    stats = self.host_stats(result._host.get_name())  # noqa: SLF001
+    stats['last_end'] = time.time()
+    action = result._task.action.split('.')[-1]  # noqa: SLF001
+    if 'time_to_ready' in data:
+      stats['time_to_ready'] = data['time_to_ready']
+    if 'downtime' in data:
+      stats['downtime'] = data['downtime']
+    if 'rescues' in data:
+      stats['rescues'] = data['rescues']
+    elif action == 'check_service' and failed:
+      stats['rescues'] += 1
+    for phase, spent in (data.get('timings') or {}).items():
+      stats['phases'][phase] = stats['phases'].get(phase, 0.0) + spent
+    if action == 'check_service' and 'elapsed' in data:
+      stats['phases']['checks'] = stats['phases'].get('checks', 0.0) + data['elapsed']
+    stats['failed'] = failed
+
+  def v2_runner_on_ok(self, result) -> None:  # noqa: ANN001
+    self.record(result, failed=False)
+
+  def v2_runner_on_failed(
+    self,
+    result,  # noqa: ANN001
+    ignore_errors: bool = False,  # noqa: ARG002,FBT001,FBT002
+  ) -> None:
+    self.record(result, failed=True)
+
+  def summary(self) -> dict:
+    ready: dict[str, float] = {}
+    for host, stats in self.hosts.items():
+      if stats['failed']:
+        continue
+      if stats['time_to_ready'] is not None:
+        ready[host] = stats['time_to_ready']
+      elif stats['first_start'] is not None and stats['last_end'] is not None:
+        ready[host] = stats['last_end'] - stats['first_start']
+    downtime = [
+      stats['downtime'] for stats in self.hosts.values()
+      if stats['downtime'] is not None and not stats['failed']
+    ]
+    rescues: dict[int, int] = {}
+    phases: dict[str, list[float]] = {}
+    for stats in self.hosts.values():
+      rescues[stats['rescues']] = rescues.get(stats['rescues'], 0) + 1
+      for phase, spent in stats['phases'].items():
+        phases.setdefault(phase, []).append(spent)
+    return {
+      'hosts': len(self.hosts),
+      'failed': sorted(host for host, stats in self.hosts.items() if stats['failed']),
+      'time_to_ready': {
+        f'p{rank}': round(percentile(list(ready.values()), rank), 3)
+        for rank in PERCENTILES
+      } if ready else {},
+      'downtime': {
+        f'p{rank}': round(percentile(downtime, rank), 3) for rank in PERCENTILES
+      } if downtime else {},
+      'rescues': {f'{count}': hosts for count, hosts in sorted(rescues.items())},
+      'phases': {
+        phase: {f'p{rank}': round(percentile(spent, rank), 3) for rank in PERCENTILES}
+        for phase, spent in phases.items()
+      },
+      'slowest': [
+        {'host': host, 'time_to_ready': round(seconds, 3)}
+        for host, seconds in sorted(ready.items(), key=lambda item: -item[1])[
+          :self.get_option('slowest')
+        ]
+      ],
+    }
+
+  def v2_playbook_on_stats(self, stats) -> None:  # noqa: ANN001,ARG002
+    if not self.hosts:
+      return
+    summary = self.summary()
+    self._display.banner('MEGA LAUNCH STATS')
+    self._display.display(
+      f'hosts [{summary["hosts"]}] failed [{len(summary["failed"])}] '
+      'time-to-ready ' + ' '.join(
+        f'{rank} [{seconds}]' for rank, seconds in summary['time_to_ready'].items()
+      ),
+    )
+    if summary['downtime']:
+      self._display.display(
+        'restart downtime ' + ' '.join(
+          f'{rank} [{seconds}]' for rank, seconds in summary['downtime'].items()
+        ),
+      )
+    self._display.display(
+      'rescues ' + ' '.join(
+        f'[{count}] x{hosts}' for count, hosts in summary['rescues'].items()
+      ),
+    )
+    for phase, ranks in summary['phases'].items():
+      self._display.display(
+        f'phase [{phase}] ' + ' '.join(
+          f'{rank} [{seconds}]' for rank, seconds in ranks.items()
+        ),
+      )
+    for slow in summary['slowest']:
+      self._display.display(f'slow [{slow["host"]}] [{slow["time_to_ready"]}]')
+    if summary['failed']:
+      self._display.display(f'failed [{", ".join(summary["failed"])}]')
+    json_path = self.get_option('json_path')
+    if json_path:
+      with open(json_path, 'w', encoding='utf-8') as f:  # noqa: PTH123
+        json.dump(summary, f, indent=2)
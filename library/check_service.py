@@ -28,9 +28,18 @@ description:
 version_added: "0.0.1"
 options:
   service_name:
-    description: systemd service name
+    description:
+      - systemd service name
+      - glob pattern like C(gaiad@*) checks every matching unit in waves
+      - template like C(gaiad@) checks instances listed in instances
     required: true
     type: str
+  main_pid:
+    description:
+      - main process of the unit owning port_list, 0 checks the ports are free
+      - read from the unit MainPID when omitted, for every unit of patterns
+    required: false
+    type: int
   port_list:
     description: list of ports
     required: false
@@ -49,6 +58,123 @@ options:
     required: false
     default: ""
     type: str
+  log_fail_regexp:
+    description:
+      - expressions searched in the same log scan as log_regexp
+      - any match fails the module with the offending lines
+    required: false
+    default: []
+    type: list
+    contains:
+      description: regular expression
+      type: str
+  log_fail_fatal:
+    description: mark log_fail_regexp failure as fatal to skip further rescues
+    required: false
+    default: false
+    type: bool
+  log_file:
+    description:
+      - tail these files for log_regexp and log_fail_regexp instead of journal
+      - rotated and truncated files are followed
+    required: false
+    type: list
+    elements: path
+  log_positions:
+    description:
+      - continue log_file tailing from log_positions of the previous result
+      - without it only lines written after the module start are scanned
+    required: false
+    type: dict
+  notify_ready:
+    description:
+      - count READY=1 of Type=notify unit as passed check
+      - read from unit ActiveState without journal scanning
+    required: false
+    default: false
+    type: bool
+  status_regexp:
+    description:
+      - expression searched in StatusText published by unit with sd_notify STATUS=
+      - combined with notify_ready both must hold for the check to pass
+    required: false
+    type: str
+  wait_timeout:
+    description:
+      - keep polling inside the module until required_checks passed or timeout
+      - zero performs a single check
+    required: false
+    default: 0
+    type: int
+  retry_delay:
+    description: delay between checks in wait mode
+    required: false
+    default: 1
+    type: int
+  required_checks:
+    description: number of passed checks to stop waiting
+    required: false
+    default: 2
+    type: int
+  helper:
+    description:
+      - perform checks through the persistent per-host helper process
+      - helper is started on demand and falls back to standalone checks
+    required: false
+    default: false
+    type: bool
+  helper_dir:
+    description:
+      - directory for helper socket, ANSIBLE_ASYNC_DIR or ~/.ansible_async by default
+      - set the same value for all modules, synchronous tasks get no ANSIBLE_ASYNC_DIR
+    required: false
+    type: path
+  helper_idle:
+    description: helper exits after this number of idle seconds
+    required: false
+    default: 300
+    type: int
+  profile:
+    description:
+      - profile the module run with cProfile and return top-N summary in result
+      - also enabled by MEGA_LAUNCH_PROFILE environment variable on the host
+    required: false
+    default: false
+    type: bool
+  profile_path:
+    description: host path to write pstats profile dump to
+    required: false
+    type: path
+  profile_top:
+    description: number of functions in the profile summary
+    required: false
+    default: 20
+    type: int
+  instances:
+    description:
+      - instances of template unit given in name, C(first..last) expands to range
+      - checked in waves as glob pattern matches
+    required: false
+    type: list
+    elements: str
+  port_step:
+    description:
+      - port_list offset per instance for template and pattern checks
+      - numeric instance is multiplier, otherwise position in sorted unit list
+    required: false
+    default: 0
+    type: int
+  wave_size:
+    description: number of instances checked concurrently in every wave
+    required: false
+    default: 5
+    type: int
+  failure_threshold:
+    description:
+      - number of failed instances tolerated, next waves are skipped above it
+    required: false
+    default: 0
+    type: int
 
 author: "Dmitrii Sukhodoev <raven428@gmail.com>"
 attributes:
@@ -90,18 +216,81 @@ matched_lines:
   contains:
     description: log line
     type: str
+failed_lines:
+  description: log lines matched by log_fail_regexp
+  type: list
+  default: []
+  returned: always
+  contains:
+    description: log line
+    type: str
+log_positions:
+  description: inode and byte offset reached in every log_file
+  type: dict
+  returned: when log_file
+  sample: {"/var/log/app.log": {"inode": 1835021, "offset": 52881}}
+status_text:
+  description: last StatusText of the unit
+  type: str
+  returned: when notify_ready or status_regexp
+  sample: "height 100, catching up"
+fatal:
+  description: log_fail_regexp matched with log_fail_fatal enabled
+  type: bool
+  returned: always
+polls:
+  description: number of performed checks
+  type: int
+  returned: always
+  sample: 1
+helper:
+  description: checks were performed through the helper process
+  type: bool
+  returned: always
+elapsed:
+  description: seconds spent in checks
+  type: float
+  returned: always
+instances:
+  description: per unit results of template or pattern check
+  type: dict
+  returned: when name is pattern or instances
+  sample: {"gaiad@1": {"passed_checks": 2, "polls": 1, "elapsed": 0.02}}
+waves:
+  description: units checked in every wave
+  type: list
+  returned: when name is pattern or instances
+failed_units:
+  description: units failed the checks or passed less than required_checks
+  type: list
+  returned: when name is pattern or instances
+skipped_units:
+  description: units not checked after failure_threshold was exceeded
+  type: list
+  returned: when name is pattern or instances
+profile:
+  description:
+    - profile summary with run_command and helper command timings
+    - error when profile_path could not be written, path is null then
+  type: dict
+  returned: when profiling enabled
 '''
 
-import os
-import re
-import time
-
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils.common.text.converters import to_native
 
 # pylint: disable=import-error,no-name-in-module
+from ansible.module_utils.mega_helper import (  # type: ignore[reportMissingImports]
+  HelperClient,
+)
 from ansible.module_utils.mega_launch import (  # type: ignore[reportMissingImports]
-  calc_ports,
+  CHECK_DEFAULTS,
+  Checker,
+  LaunchError,
+  WaveRunner,
+  is_pattern,
+)
+from ansible.module_utils.mega_profile import (  # type: ignore[reportMissingImports]
+  ModuleProfiler,
 )
 
 
@@ -134,7 +323,7 @@ def main() -> None:
       },
       'log_epoch': {
         'type': 'int',
-        'default': int(time.time()),
+        'default': None,
         'required': False,
         'aliases': ['log-epoch'],
       },
@@ -144,54 +333,169 @@ def main() -> None:
         'required': False,
         'aliases': ['log-expression'],
       },
+      'log_fail_regexp': {
+        'type': 'list',
+        'default': None,
+        'elements': 'str',
+        'required': False,
+        'aliases': ['log-fail-regexp'],
+      },
+      'log_fail_fatal': {
+        'type': 'bool',
+        'default': False,
+        'required': False,
+        'aliases': ['log-fail-fatal'],
+      },
+      'log_file': {
+        'type': 'list',
+        'default': None,
+        'elements': 'path',
+        'required': False,
+        'aliases': ['log-file', 'log_files'],
+      },
+      'log_positions': {
+        'type': 'dict',
+        'default': None,
+        'required': False,
+        'aliases': ['log-positions'],
+      },
+      'notify_ready': {
+        'type': 'bool',
+        'default': False,
+        'required': False,
+        'aliases': ['notify-ready'],
+      },
+      'status_regexp': {
+        'type': 'str',
+        'default': None,
+        'required': False,
+        'aliases': ['status-regexp'],
+      },
+      'wait_timeout': {
+        'type': 'int',
+        'default': 0,
+        'required': False,
+        'aliases': ['wait-timeout'],
+      },
+      'retry_delay': {
+        'type': 'int',
+        'default': 1,
+        'required': False,
+        'aliases': ['retry-delay'],
+      },
+      'required_checks': {
+        'type': 'int',
+        'default': 2,
+        'required': False,
+        'aliases': ['required-checks'],
+      },
+      'helper': {
+        'type': 'bool',
+        'default': False,
+        'required': False,
+      },
+      'helper_dir': {
+        'type': 'path',
+        'default': None,
+        'required': False,
+        'aliases': ['helper-dir'],
+      },
+      'helper_idle': {
+        'type': 'int',
+        'default': 300,
+        'required': False,
+        'aliases': ['helper-idle'],
+      },
+      'profile': {
+        'type': 'bool',
+        'default': False,
+        'required': False,
+      },
+      'profile_path': {
+        'type': 'path',
+        'default': None,
+        'required': False,
+        'aliases': ['profile-path'],
+      },
+      'profile_top': {
+        'type': 'int',
+        'default': 20,
+        'required': False,
+        'aliases': ['profile-top'],
+      },
+      'instances': {
+        'type': 'list',
+        'default': None,
+        'elements': 'str',
+        'required': False,
+      },
+      'port_step': {
+        'type': 'int',
+        'default': 0,
+        'required': False,
+        'aliases': ['port-step'],
+      },
+      'wave_size': {
+        'type': 'int',
+        'default': 5,
+        'required': False,
+        'aliases': ['wave-size'],
+      },
+      'failure_threshold': {
+        'type': 'int',
+        'default': 0,
+        'required': False,
+        'aliases': ['failure-threshold'],
+      },
     },
     supports_check_mode=True,
   )
-  unit = module.params['name']
-  for globpattern in (r'*', r'?', r'['):
-    if globpattern in unit:
-      module.fail_json(
-        msg=(
-          'This module does not currently support using glob patterns, found '
-          f'[{globpattern}] in [{unit}] service'
-        ),
-      )
-  result: dict = {
-    'changed': False,
-    'passed_checks': 0,
-    'ports': set(),
-    'matched_lines': [],
-  }
-  if module.params.get('port_list'):
-    result['passed_checks'] = calc_ports(
-      main_pid=int(module.params.get('main_pid', 0)),
-      result_ports=result['ports'],
-      module_ports=set(module.params.get('port_list', [])),
+  profiler = ModuleProfiler.attach(module)
+  journalctl = ''
+  if (
+    module.params['log_regexp'] or module.params['log_fail_regexp']
+  ) and not module.params['log_file']:
+    journalctl = module.get_bin_path('journalctl', required=True) or ''
+  pattern = is_pattern(module.params['name'], module.params['instances'])
+  systemctl = 'systemctl'
+  if module.params['notify_ready'] or module.params['status_regexp'] or pattern or (
+    module.params['port_list'] and module.params['main_pid'] is None
+  ):
+    systemctl = module.get_bin_path('systemctl', required=True) or ''
+  helper = None
+  if module.params['helper']:
+    helper = HelperClient(
+      path=module.params['helper_dir'],
+      idle_timeout=module.params['helper_idle'],
     )
-  if module.params.get('log_regexp'):
-    journalctl = module.get_bin_path('journalctl', required=True)
-    if os.getenv('XDG_RUNTIME_DIR') is None:
-      os.environ['XDG_RUNTIME_DIR'] = f'/run/user/{os.geteuid()}'
-    command = "{} -t '{}' -S '{}' -o short".format(
-      journalctl,
-      unit,
-      time.strftime(
-        '%F %H:%M:%S',
-        time.localtime(module.params['log_epoch'] - 1),
-      ),
+    if profiler:
+      profiler.track(helper)
+    if not helper.start():
+      helper = None
+  params = {key: module.params[key] for key in CHECK_DEFAULTS}
+  try:
+    if pattern:
+      module.exit_json(**WaveRunner(
+        params,
+        run_command=module.run_command,
+        systemctl=systemctl,
+      ).run(lambda unit_params: Checker(
+        params=unit_params,
+        run_command=module.run_command,
+        journalctl=journalctl,
+        helper=helper,
+        systemctl=systemctl,
+      ).run()))
+    checker = Checker(
+      params=params,
+      run_command=module.run_command,
+      journalctl=journalctl,
+      helper=helper,
+      systemctl=systemctl,
     )
-    (rc, out, err) = module.run_command(command)
-    if rc != 0:
-      module.fail_json(msg=f"Unable journalctl -t '{unit}': {err}")
-    log_regexp_matched = False
-    if out:
-      parser = re.compile(module.params['log_regexp'])
-      for line in to_native(out).split('\n'):
-        if parser.match(line):
-          result['matched_lines'].append(line)
-          log_regexp_matched = True
-    result['passed_checks'] += int(log_regexp_matched)
-  module.exit_json(**result)
+    module.exit_json(**checker.run())
+  except LaunchError as e:
+    module.fail_json(**e.result)
 
 
 if __name__ == '__main__':
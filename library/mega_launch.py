@@ -32,7 +32,10 @@ description:
 version_added: "0.0.1"
 options:
   service_name:
-    description: systemd service name
+    description:
+      - systemd service name
+      - glob pattern like C(gaiad@*) launches every matching unit in waves
+      - template like C(gaiad@) launches instances listed in instances
     required: true
     type: str
   wait_timeout:
@@ -46,10 +49,25 @@ options:
     default: 5
     type: int
   rescue_delay:
-    description: delay between restarts
+    description: delay between restarts, base for backoff strategies
     required: false
     default: 3
     type: int
+  rescue_backoff:
+    description:
+      - strategy of delays between restarts
+      - fixed sleeps rescue_delay every time
+      - exponential doubles delay with equal jitter
+      - decorrelated picks random delay between rescue_delay and triple previous
+    required: false
+    default: fixed
+    choices: [fixed, exponential, decorrelated]
+    type: str
+  rescue_delay_max:
+    description: cap of delay between restarts
+    required: false
+    default: 60
+    type: int
   retry_delay:
     description: delay between checks
     required: false
@@ -68,11 +86,195 @@ options:
     required: false
     default: ""
     type: str
+  log_fail_regexp:
+    description:
+      - regular expressions searched in the same log scan as log_regexp
+      - any match immediately fails the current attempt
+    required: false
+    default: []
+    type: list
+    contains:
+      description: regular expression
+      type: str
+  log_fail_fatal:
+    description: fail the task without further rescues on log_fail_regexp match
+    required: false
+    default: false
+    type: bool
+  log_file:
+    description:
+      - tail these files for log_regexp and log_fail_regexp instead of journal
+      - only lines written after each start are scanned, rotation is followed
+    required: false
+    type: list
+    elements: path
+  notify_ready:
+    description:
+      - count READY=1 of Type=notify unit as passed check
+      - read from unit ActiveState without journal scanning
+    required: false
+    default: false
+    type: bool
+  status_regexp:
+    description:
+      - expression searched in StatusText published by unit with sd_notify STATUS=
+      - combined with notify_ready both must hold for the check to pass
+    required: false
+    type: str
+  helper:
+    description:
+      - perform status queries and checks through the persistent helper process
+      - helper is started on demand and falls back to standalone checks
+    required: false
+    default: false
+    type: bool
+  helper_dir:
+    description:
+      - directory for helper socket, ANSIBLE_ASYNC_DIR or ~/.ansible_async by default
+      - set the same value for all modules, synchronous tasks get no ANSIBLE_ASYNC_DIR
+    required: false
+    type: path
+  helper_idle:
+    description: helper exits after this number of idle seconds
+    required: false
+    default: 300
+    type: int
+  profile:
+    description:
+      - profile the module run with cProfile and return top-N summary in result
+      - also enabled by MEGA_LAUNCH_PROFILE environment variable on the host
+    required: false
+    default: false
+    type: bool
+  profile_path:
+    description: host path to write pstats profile dump to
+    required: false
+    type: path
+  profile_top:
+    description: number of functions in the profile summary
+    required: false
+    default: 20
+    type: int
+  settle_cpu:
+    description:
+      - CPU usage percent of unit processes to count as settled
+      - enables resource settling check together with or without settle_io
+    required: false
+    type: float
+  settle_io:
+    description:
+      - disk read and write bytes per second of unit processes to count as settled
+      - enables resource settling check together with or without settle_cpu
+    required: false
+    type: int
+  settle_duration:
+    description: seconds resource usage must stay below thresholds to pass check
+    required: false
+    default: 10
+    type: int
+  warmup_paths:
+    description:
+      - files or directories to read into page cache before the first start
+      - directories are walked recursively, files are warmed in parallel
+    required: false
+    type: list
+    elements: path
+  warmup_budget:
+    description: maximum bytes to warm up, 0 means unlimited
+    required: false
+    default: 0
+    type: int
+  warmup_workers:
+    description: number of files warmed up concurrently
+    required: false
+    default: 4
+    type: int
+  warmup_method:
+    description:
+      - read reads files through and returns when data is cached
+      - fadvise asks kernel to read ahead by posix_fadvise WILLNEED, returns at once
+        without waiting, so nothing is counted as warmed
+      - read is used when posix_fadvise is not available
+    required: false
+    default: read
+    choices: [fadvise, read]
+    type: str
+  warmup_timeout:
+    description:
+      - seconds for the whole warm-up, left files are skipped after it (0 is unlimited)
+      - role adds it to async budget of the launch
+    required: false
+    default: 0
+    type: int
   required_checks:
     description: number of required checks to success
     required: false
     default: 2
     type: int
+  verdict_ttl:
+    description:
+      - seconds to trust cached passed verdict of the same running service
+      - verdict is keyed by unit, InvocationID and check parameters
+      - cached verdict skips the checks after single state probe, 0 disables
+    required: false
+    default: 0
+    type: int
+  verdict_dir:
+    description: directory for cached verdicts, async directory by default
+    required: false
+    type: path
+  state:
+    description:
+      - started starts the unit when it is not running
+      - restarted stops running unit, waits for its processes exit and port_list
+        release, then starts and checks it within the same module run
+    required: false
+    default: started
+    choices: [started, restarted]
+    type: str
+  no_block:
+    description:
+      - enqueue start job with systemctl --no-block and check ports and log at once
+      - start job is tracked by unit Job property, its failure fails the task
+    required: false
+    default: false
+    type: bool
+  stop_timeout:
+    description: seconds to wait for processes exit and ports release on restart
+    required: false
+    default: 30
+    type: int
+  murder_delay:
+    description:
+      - seconds to wait for processes exit after stop before SIGTERM and then SIGKILL
+    required: false
+    default: 2
+    type: int
+  instances:
+    description:
+      - instances of template unit given in name, C(first..last) expands to range
+      - launched in waves as glob pattern matches
+    required: false
+    type: list
+    elements: str
+  port_step:
+    description:
+      - port_list offset per instance for template and pattern launches
+      - numeric instance is multiplier, otherwise position in sorted unit list
+    required: false
+    default: 0
+    type: int
+  wave_size:
+    description: number of instances launched concurrently in every wave
+    required: false
+    default: 5
+    type: int
+  failure_threshold:
+    description:
+      - number of failed instances tolerated, next waves are skipped above it
+    required: false
+    default: 0
+    type: int
 
 author: "Dmitrii Sukhodoev <raven428@gmail.com>"
 attributes:
@@ -114,19 +316,134 @@ match_lines:
   contains:
     description: log line
     type: str
+failed_lines:
+  description: log lines matched by log_fail_regexp
+  type: list
+  default: []
+  returned: always
+  contains:
+    description: log line
+    type: str
+log_positions:
+  description: inode and byte offset reached in every log_file
+  type: dict
+  returned: when log_file
+  sample: {"/var/log/app.log": {"inode": 1835021, "offset": 52881}}
+status_text:
+  description: last StatusText of the unit
+  type: str
+  returned: when notify_ready or status_regexp
+  sample: "height 100, catching up"
+fatal:
+  description: attempt was aborted by log_fail_regexp with log_fail_fatal
+  type: bool
+  returned: when fatal
+helper:
+  description: checks were performed through the helper process
+  type: bool
+  returned: always
+rescues:
+  description: number of failed attempts handled by rescue
+  type: int
+  returned: always
+  sample: 0
+timings:
+  description: seconds spent in start, checks and rescue phases
+  type: dict
+  returned: always
+  sample: {"start": 0.12, "checks": 3.05, "rescue": 0.0}
+cached:
+  description: result is cached verdict of already running service
+  type: bool
+  returned: when verdict_ttl
+verdict_age:
+  description: age of cached verdict in seconds
+  type: float
+  returned: when cached
+warmup:
+  description:
+    - page cache warm-up summary with files, bytes read through and requested
+    - bytes stay 0 with fadvise method, kernel reads ahead after return
+    - elapsed seconds, method actually used and unreadable paths
+    - timed_out when warmup_timeout skipped the rest of files
+  type: dict
+  returned: when warmup_paths
+  sample: {"files": 12, "bytes": 4294967296, "requested": 4294967296,
+    "elapsed": 3.2, "method": "read", "timed_out": false, "errors": []}
+settle:
+  description:
+    - resource usage samples of the last attempt as columns
+    - t is seconds from attempt start, cpu is percent, io is bytes per second
+  type: dict
+  returned: when settle_cpu or settle_io
+  sample: {"t": [1.01, 2.02], "cpu": [97.5, 3.1], "io": [5242880, 0]}
+rescue_delays:
+  description: actual delays between restarts
+  type: list
+  returned: always
+  contains:
+    description: delay in seconds
+    type: float
+activation:
+  description: seconds from start job enqueue to its completion in the last attempt
+  type: float
+  returned: when no_block and start job completed before passed checks
+  sample: 2.71
+time_to_ready:
+  description: seconds from the first start to passed checks
+  type: float
+  returned: success
+downtime:
+  description: seconds from stopping running service to passed checks on restart
+  type: float
+  returned: when state is restarted and service was running
+  sample: 4.21
+downtimes:
+  description: seconds since service stop at the end of every attempt
+  type: list
+  returned: when state is restarted and service was running
+  sample: [9.8, 14.2]
+instances:
+  description: per unit results of template or pattern launch
+  type: dict
+  returned: when name is pattern or instances
+  sample: {"gaiad@1": {"changed": true, "passed_checks": 2, "time_to_ready": 4.1}}
+waves:
+  description: units launched in every wave
+  type: list
+  returned: when name is pattern or instances
+  sample: [["gaiad@1", "gaiad@2"], ["gaiad@3"]]
+failed_units:
+  description: units failed to launch
+  type: list
+  returned: when name is pattern or instances
+skipped_units:
+  description: units not launched after failure_threshold was exceeded
+  type: list
+  returned: when name is pattern or instances
+profile:
+  description:
+    - profile summary with run_command and helper command timings
+    - error when profile_path could not be written, path is null then
+  type: dict
+  returned: when profiling enabled
 '''
 
-import os
-import re
-import syslog
-import time
-
 from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils.common.text.converters import to_native
 
 # pylint: disable=import-error,no-name-in-module
+from ansible.module_utils.mega_helper import (  # type: ignore[reportMissingImports]
+  HelperClient,
+)
 from ansible.module_utils.mega_launch import (  # type: ignore[reportMissingImports]
-  calc_ports,
+  LAUNCH_DEFAULTS,
+  Launcher,
+  LaunchError,
+  WaveRunner,
+  is_pattern,
+)
+from ansible.module_utils.mega_profile import (  # type: ignore[reportMissingImports]
+  ModuleProfiler,
 )
 from ansible.module_utils.service import (
   fail_if_missing,
@@ -134,80 +451,7 @@ from ansible.module_utils.service import (
 )
 
 
-class ServiceStatus:
-  def __init__(
-    self,
-    unit: str,
-    module: AnsibleModule,
-    systemctl: str | None = None,
-  ) -> None:
-    self.unit = unit
-    self.module = module
-    self.systemctl: str = (
-      systemctl or module.get_bin_path(arg='systemctl', required=True) or ''
-    )
-    if module.params.get('scope') != 'system':
-      self.systemctl += f' --{module.params["scope"]}'
-    self.status: dict[str, str] | None = {}
-    self.rc, out, _ = self.module.run_command(f"{self.systemctl} show '{self.unit}'")
-    if self.rc != 0:
-      self.status = None
-    else:
-      self.status = parse_systemctl_show(to_native(out).split('\n'))
-
-  def get(self, key: str, default: str | None = None) -> str | None:
-    if not self.status:
-      return default
-    return self.status.get(key, default)
-
-  def __getitem__(self, key: str) -> str:
-    if not self.status:
-      msg = f'Service [{self.unit}] status not available'
-      raise KeyError(msg)
-    return self.status[key]
-
-  def __contains__(self, key: str) -> bool:
-    if not self.status:
-      return False
-    return key in self.status
-
-  def __bool__(self) -> bool:
-    if not self.status or not isinstance(self.status, dict):
-      return False
-    return self.status.get('SubState') == 'running' \
-      and self.status.get('ActiveState') == 'active' \
-      and int(self.status.get('MainPID') or '0') > 0
-
-
-def request_was_ignored(out: str) -> bool:
-  return '=' not in out and ('ignoring request' in out or 'ignoring command' in out)
-
-
-def parse_systemctl_show(lines: list[str]) -> dict:
-  multival: list[str] = []
-  parsed = {}
-  key = ''
-  for line in lines:
-    if key:
-      continue
-    if '=' in line:
-      key, value = line.split('=', 1)
-      if key.startswith('Exec') and value.lstrip(
-      ).startswith('{') and not value.rstrip().endswith('}'):
-        multival.append(value)
-        continue
-      parsed[key] = value.strip()
-      key = ''
-    else:
-      multival.append(line)
-      if line.rstrip().endswith('}'):
-        parsed[key] = '\n'.join(multival).strip()
-        multival = []
-        key = ''
-  return parsed
-
-
-def main() -> None:  # noqa: C901,PLR0912,PLR0914,PLR0915
+def main() -> None:
   module = AnsibleModule(
     argument_spec={
       'name': {
@@ -239,6 +483,19 @@ def main() -> None:  # noqa: C901,PLR0912,PLR0914,PLR0915
         'required': False,
         'aliases': ['rescue-delay'],
       },
+      'rescue_backoff': {
+        'type': 'str',
+        'default': 'fixed',
+        'required': False,
+        'choices': ['fixed', 'exponential', 'decorrelated'],
+        'aliases': ['rescue-backoff'],
+      },
+      'rescue_delay_max': {
+        'type': 'int',
+        'default': 60,
+        'required': False,
+        'aliases': ['rescue-delay-max'],
+      },
       'retry_delay': {
         'type': 'int',
         'default': 1,
@@ -258,12 +515,164 @@ def main() -> None:  # noqa: C901,PLR0912,PLR0914,PLR0915
         'required': False,
         'aliases': ['log-regexp'],
       },
+      'log_fail_regexp': {
+        'type': 'list',
+        'default': None,
+        'elements': 'str',
+        'required': False,
+        'aliases': ['log-fail-regexp'],
+      },
+      'log_fail_fatal': {
+        'type': 'bool',
+        'default': False,
+        'required': False,
+        'aliases': ['log-fail-fatal'],
+      },
+      'log_file': {
+        'type': 'list',
+        'default': None,
+        'elements': 'path',
+        'required': False,
+        'aliases': ['log-file', 'log_files'],
+      },
+      'notify_ready': {
+        'type': 'bool',
+        'default': False,
+        'required': False,
+        'aliases': ['notify-ready'],
+      },
+      'status_regexp': {
+        'type': 'str',
+        'default': None,
+        'required': False,
+        'aliases': ['status-regexp'],
+      },
+      'helper': {
+        'type': 'bool',
+        'default': False,
+        'required': False,
+      },
+      'helper_dir': {
+        'type': 'path',
+        'default': None,
+        'required': False,
+        'aliases': ['helper-dir'],
+      },
+      'helper_idle': {
+        'type': 'int',
+        'default': 300,
+        'required': False,
+        'aliases': ['helper-idle'],
+      },
+      'profile': {
+        'type': 'bool',
+        'default': False,
+        'required': False,
+      },
+      'profile_path': {
+        'type': 'path',
+        'default': None,
+        'required': False,
+        'aliases': ['profile-path'],
+      },
+      'profile_top': {
+        'type': 'int',
+        'default': 20,
+        'required': False,
+        'aliases': ['profile-top'],
+      },
+      'settle_cpu': {
+        'type': 'float',
+        'default': None,
+        'required': False,
+        'aliases': ['settle-cpu'],
+      },
+      'settle_io': {
+        'type': 'int',
+        'default': None,
+        'required': False,
+        'aliases': ['settle-io'],
+      },
+      'settle_duration': {
+        'type': 'int',
+        'default': 10,
+        'required': False,
+        'aliases': ['settle-duration'],
+      },
+      'warmup_paths': {
+        'type': 'list',
+        'default': None,
+        'elements': 'path',
+        'required': False,
+        'aliases': ['warmup-paths'],
+      },
+      'warmup_budget': {
+        'type': 'int',
+        'default': 0,
+        'required': False,
+        'aliases': ['warmup-budget'],
+      },
+      'warmup_workers': {
+        'type': 'int',
+        'default': 4,
+        'required': False,
+        'aliases': ['warmup-workers'],
+      },
+      'warmup_method': {
+        'type': 'str',
+        'default': 'read',
+        'required': False,
+        'choices': ['fadvise', 'read'],
+        'aliases': ['warmup-method'],
+      },
+      'warmup_timeout': {
+        'type': 'int',
+        'default': 0,
+        'required': False,
+        'aliases': ['warmup-timeout'],
+      },
       'required_checks': {
         'type': 'int',
         'default': 2,
         'required': False,
         'aliases': ['required-checks'],
       },
+      'verdict_ttl': {
+        'type': 'int',
+        'default': 0,
+        'required': False,
+        'aliases': ['verdict-ttl'],
+      },
+      'verdict_dir': {
+        'type': 'path',
+        'default': None,
+        'required': False,
+        'aliases': ['verdict-dir'],
+      },
+      'state': {
+        'type': 'str',
+        'default': 'started',
+        'required': False,
+        'choices': ['started', 'restarted'],
+      },
+      'no_block': {
+        'type': 'bool',
+        'default': False,
+        'required': False,
+        'aliases': ['no-block'],
+      },
+      'stop_timeout': {
+        'type': 'int',
+        'default': 30,
+        'required': False,
+        'aliases': ['stop-timeout'],
+      },
+      'murder_delay': {
+        'type': 'int',
+        'default': 2,
+        'required': False,
+        'aliases': ['murder-delay'],
+      },
       'epoch': {
         'type': 'str',
         'default': None,
@@ -278,183 +687,87 @@ def main() -> None:  # noqa: C901,PLR0912,PLR0914,PLR0915
           'system',
         ],
       },
+      'instances': {
+        'type': 'list',
+        'default': None,
+        'elements': 'str',
+        'required': False,
+      },
+      'port_step': {
+        'type': 'int',
+        'default': 0,
+        'required': False,
+        'aliases': ['port-step'],
+      },
+      'wave_size': {
+        'type': 'int',
+        'default': 5,
+        'required': False,
+        'aliases': ['wave-size'],
+      },
+      'failure_threshold': {
+        'type': 'int',
+        'default': 0,
+        'required': False,
+        'aliases': ['failure-threshold'],
+      },
     },
     supports_check_mode=True,
   )
+  profiler = ModuleProfiler.attach(module)
   unit = module.params['name']
-  wait_timeout = module.params['wait_timeout']
-  if unit is not None:
-    for globpattern in (r'*', r'?', r'['):
-      if globpattern in unit:
-        module.fail_json(
-          msg='This module does not currently support using glob patterns, found '
-          f'[{globpattern}] in [{unit}] service',
-        )
-  systemctl: str = module.get_bin_path(arg='systemctl', required=True) or ''
-  journalctl: str = module.get_bin_path(arg='journalctl', required=True) or ''
-  if os.getenv('XDG_RUNTIME_DIR') is None:
-    os.environ['XDG_RUNTIME_DIR'] = f'/run/user/{os.geteuid()}'
-  if module.params['scope'] != 'system':
-    systemctl += f' --{module.params["scope"]}'
-    journalctl += f' --{module.params["scope"]}'
-  rc = 0
-  out = err = ''
-  result: dict = {
-    'changed': False,
-    'passed_checks': 0,
-    'ports': set(),
-    'matched_lines': [],
+  params = {
+    **{key: module.params[key] for key in LAUNCH_DEFAULTS},
+    'verdict_dir': module.params['verdict_dir'],
   }
-
-  # systemd_service from Ansible part begin
-  found = False
-  if unit:
+  systemctl = module.get_bin_path(arg='systemctl', required=True) or ''
+  journalctl = module.get_bin_path(arg='journalctl', required=True) or ''
+  helper = None
+  if module.params['helper']:
+    helper = HelperClient(
+      path=module.params['helper_dir'],
+      idle_timeout=module.params['helper_idle'],
+    )
+    if profiler:
+      profiler.track(helper)
+  try:
+    if is_pattern(unit, module.params['instances']):
+      if helper and not helper.start():
+        helper = None
+      module.exit_json(**WaveRunner(
+        params,
+        run_command=module.run_command,
+        systemctl=systemctl,
+      ).run(lambda unit_params: Launcher(
+        params=unit_params,
+        run_command=module.run_command,
+        systemctl=systemctl,
+        journalctl=journalctl,
+        check_mode=module.check_mode,
+        helper=helper,
+      ).run()))
+    launcher = Launcher(
+      params=params,
+      run_command=module.run_command,
+      systemctl=systemctl,
+      journalctl=journalctl,
+      check_mode=module.check_mode,
+    )
+    if launcher.cached():
+      module.exit_json(**launcher.result)
+    is_systemd = launcher.discover()
     is_initd = sysv_exists(unit)
-    is_systemd = False
-    (rc, out, err) = module.run_command(f"{systemctl} show '{unit}'")
-    if rc == 0 and not (request_was_ignored(out) or request_was_ignored(err)):
-      if out:
-        result['status'] = parse_systemctl_show(to_native(out).split('\n'))
-        is_systemd = (
-          'LoadState' in result['status'] and result['status']['LoadState'] != 'not-found'
-        )
-        is_masked = (
-          'LoadState' in result['status'] and result['status']['LoadState'] == 'masked'
-        )
-        if is_systemd and not is_masked and 'LoadError' in result['status']:
-          module.fail_json(
-            msg=f"Error loading unit file '{unit}': {result['status']['LoadError']}",
-          )
-    elif err and rc == 1 and 'Failed to parse bus message' in err:
-      result['status'] = parse_systemctl_show(to_native(out).split('\n'))
-      unit_base, sep, _suffix = unit.partition('@')
-      unit_search = f'{unit_base}{sep}'
-      (rc, out, err) = module.run_command(f"{systemctl} list-unit-files '{unit_search}*'")
-      is_systemd = unit_search in out
-      (rc, out, err) = module.run_command(f"{systemctl} is-active '{unit}'")
-      result['status']['ActiveState'] = out.rstrip('\n')
-    else:
-      valid_enabled_states = [
-        'enabled',
-        'enabled-runtime',
-        'linked',
-        'linked-runtime',
-        'masked',
-        'masked-runtime',
-        'static',
-        'indirect',
-        'disabled',
-        'generated',
-        'transient',
-      ]
-      (rc, out, err) = module.run_command(f"{systemctl} is-enabled '{unit}'")
-      if out.strip() in valid_enabled_states:
-        is_systemd = True
-      else:
-        (rc, out, err) = module.run_command(f"{systemctl} list-unit-files '{unit}'")
-        if rc == 0:
-          is_systemd = True
-        else:
-          module.run_command(systemctl, check_rc=True)
-    found = is_systemd or is_initd
     if is_initd and not is_systemd:
       module.warn(
         f'The service ({unit}) is actually an init script but the system is managed '
         'by systemd',
       )
-  fail_if_missing(module, found, unit, msg='host')
-  if 'ActiveState' not in result['status']:
-    module.fail_json(msg='Unknown service state', status=result['status'])
-  # systemd_service from Ansible part end
-
-  current_retry = 0
-  log_regexp = module.params.get('log_regexp')
-  parser: re.Pattern[str] | None = re.compile(log_regexp) if log_regexp else None
-  epoch = module.params['epoch']
-  syslog.openlog(
-    f'mega-launch-{unit}{"" if epoch is None else f"-{epoch}"}',
-    0,
-    getattr(syslog, 'LOG_USER', syslog.LOG_USER),
-  )
-  running_before = ServiceStatus(unit, module)
-  while (
-    result['passed_checks'] < module.params['required_checks']
-    and current_retry < module.params['max_rescues']
-  ):
-    current_retry += 1
-    result['passed_checks'] = 0
-    service_start_time = time.time() - 1
-    if not module.check_mode:
-      (rc, out, err) = module.run_command(f"{systemctl} start '{unit}'")
-      if rc != 0:
-        module.fail_json(msg=f'Unable to start service {unit}: {err}')
-    running_service = ServiceStatus(unit, module)
-    if not running_service:
-      if module.check_mode:
-        result['changed'] = True
-        module.exit_json(**result)
-      else:
-        module.fail_json(msg=f'Service {unit} unable to start')
-    syslog.syslog(
-      syslog.LOG_INFO,
-      f'retry [{current_retry}/{module.params["max_rescues"]}] '
-      f'{"check_mode" if module.check_mode else "start"}'
-      f' [{unit}] service',
-    )
-    check_epoch = time.time()
-    while (
-      result['passed_checks'] < module.params['required_checks']
-      and time.time() - check_epoch < wait_timeout and running_service
-    ):
-      running_service = ServiceStatus(unit, module)
-      result['passed_checks'] = calc_ports(
-        main_pid=int(running_service.get('MainPID', '0') or '0'),
-        result_ports=result['ports'],
-        module_ports=set(module.params.get('port_list', [])),
-      )
-      (rc, out, err) = module.run_command(
-        f"{journalctl} -t '{unit}' -S '@{service_start_time:0.3f}' -o short-iso",
-      )
-      if rc != 0:
-        module.fail_json(msg=f"Unable journalctl -t '{unit}': {err}")
-      log_exp_matched = False
-      if out and parser:
-        for line in to_native(out).split('\n'):
-          if parser.match(line):
-            result['matched_lines'].append(line)
-            log_exp_matched = True
-            break
-      result['passed_checks'] += int(log_exp_matched)
-      syslog.syslog(
-        syslog.LOG_INFO,
-        f'remain [{wait_timeout - time.time() + check_epoch:.2f}] seconds ['
-        f'{result["passed_checks"]}/{module.params["required_checks"]}] checks',
-      )
-      time.sleep(module.params['retry_delay'])
-    syslog.syslog(syslog.LOG_INFO, 'loop 2 exit')
-    if result['passed_checks'] < module.params['required_checks']:
-      if not module.check_mode and not running_before:
-        (rc, out, err) = module.run_command(f"{systemctl} stop '{unit}'")
-        if rc != 0:
-          module.fail_json(msg=f'Unable to stop service {unit}: {err}')
-      syslog.syslog(
-        syslog.LOG_INFO,
-        f'not enough [{result["passed_checks"]}/{module.params["required_checks"]}]'
-        f' checks, [{unit}] '
-        f'{"check_mode" if module.check_mode else "stopped"}',
-      )
-      time.sleep(module.params['rescue_delay'])
-  if result['passed_checks'] < module.params['required_checks']:
-    result['msg'] = (
-      f'Passed checks [{result["passed_checks"]}] less '
-      f'than [{module.params["required_checks"]}] required checks'
-    )
-    result['changed'] = False
-    module.fail_json(**result)
-  elif not running_before:
-    result['changed'] = True
-  syslog.closelog()
-  module.exit_json(**result)
+    fail_if_missing(module, is_systemd or is_initd, unit, msg='host')
+    if helper and helper.start():
+      launcher.helper = helper
+    module.exit_json(**launcher.launch())
+  except LaunchError as e:
+    module.fail_json(**e.result)
 
 
 if __name__ == '__main__':
@@ -28,6 +28,22 @@ options:
     type: str
     choices: [ cleanup, status ]
     default: status
+  helper:
+    description:
+    - Read launch warnings through the persistent per-host helper process
+    - Helper is started on demand and falls back to standalone mode
+    type: bool
+    default: false
+  helper_dir:
+    description:
+    - Directory for helper socket, E(ANSIBLE_ASYNC_DIR) or C(~/.ansible_async) by default
+    - Set the same value as for M(mega_launch) and M(check_service)
+    type: path
+  helper_idle:
+    description:
+    - Helper exits after this number of idle seconds
+    type: int
+    default: 300
 notes:
   - The RV(started) and RV(finished) return values were updated to return V(True) or
       V(False) instead of V(1) or V(0) in ansible-core 2.19.
@@ -120,8 +136,13 @@ from ansible.module_utils.basic import (  # type: ignore[reportMissingImports]
   AnsibleModule,
 )
 
+# pylint: disable=import-error,no-name-in-module
+from ansible.module_utils.mega_helper import (  # type: ignore[reportMissingImports]
+  HelperClient,
+)
+
 
-def main() -> None:
+def main() -> None:  # noqa: C901,PLR0914
 
   module = AnsibleModule(
     argument_spec={
@@ -149,6 +170,18 @@ def main() -> None:
         'type': 'str',
         'default': None,
       },
+      'helper': {
+        'type': 'bool',
+        'default': False,
+      },
+      'helper_idle': {
+        'type': 'int',
+        'default': 300,
+      },
+      'helper_dir': {
+        'type': 'path',
+        'default': None,
+      },
       '_async_dir': {
         'type': 'path',
         'required': True,
@@ -208,10 +241,19 @@ def main() -> None:
   journalctl = module.get_bin_path(arg='journalctl', required=True)
   # new_recent = f'{int(time.time() * 10) / 10:.1f}'  # noqa: ERA001
   new_recent = f'{time.time()}'
-  (rc, out, err) = module.run_command(
+  command = (
     f"{journalctl} -t 'mega-launch-{unit}{'' if epoch is None else f'-{epoch}'}'" +
-    ('' if recent is None else f" -S '@{recent}'") + ' -o cat',
+    ('' if recent is None else f" -S '@{recent}'") + ' -o cat'
   )
+  response = None
+  if module.params['helper']:
+    client = HelperClient(
+      path=module.params['helper_dir'],
+      idle_timeout=module.params['helper_idle'],
+    )
+    if client.start():
+      response = client.run_command(command)
+  (rc, out, err) = response or module.run_command(command)
   if rc != 0:
     module.fail_json(msg=f"Unable journalctl -t '{unit}': {err}")
   warning_lines: list = []
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import contextlib
+import fcntl
+import json
+import os
+import shlex
+import socket
+import socketserver
+import time
+
+# pylint: disable=import-error,no-name-in-module
+from ansible.module_utils import mega_launch  # type: ignore[reportMissingImports]
+from ansible.module_utils.mega_launch import (  # type: ignore[reportMissingImports]
+  JournalScanner,
+  calc_ports,
+  state_dir,
+)
+
+HELPER_SOCKET = 'mega-helper.sock'
+HELPER_LOCK = 'mega-helper.lock'
+HELPER_BINARIES = ('systemctl', 'journalctl')
+HELPER_READ_VERBS = ('show', 'is-active', 'is-enabled', 'list-unit-files')
+HELPER_JOURNAL_OPTIONS = (
+  '-q', '-t', '-u', '-S', '-o', '-n', '--show-cursor', '--after-cursor', '--user',
+  '--system',
+)
+REQUEST_TIMEOUT = 30
+SPAWN_TIMEOUT = 3
+
+
+def run_command(command: str) -> tuple[int, str, str]:
+  args = shlex.split(command)
+  binary = os.path.basename(args[0]) if args else ''  # noqa: PTH119
+  verbs = [arg for arg in args[1:] if not arg.startswith('-')]
+  options = [arg.split('=', 1)[0] for arg in args[1:] if arg.startswith('-')]
+  # journalctl has mutating options like --rotate or --vacuum-size, pass readers
+  allowed = {
+    'systemctl': bool(verbs) and verbs[0] in HELPER_READ_VERBS,
+    'journalctl': all(option in HELPER_JOURNAL_OPTIONS for option in options),
+  }
+  if binary not in HELPER_BINARIES or not allowed[binary]:
+    return 1, '', f'Command [{command}] is not allowed in helper'
+  return mega_launch.run_command(command)
+
+
+class HelperState:
+  def __init__(self, idle_timeout: int) -> None:
+    self.idle_timeout = idle_timeout
+    self.last_seen = time.time()
+    self.sessions: dict[str, JournalScanner] = {}
+    self.origins: dict[str, tuple] = {}
+    self.touched: dict[str, float] = {}
+
+  def expire(self) -> None:
+    for session, touched in list(self.touched.items()):
+      if time.time() - touched > self.idle_timeout:
+        del self.sessions[session]
+        del self.origins[session]
+        del self.touched[session]
+
+  def idle(self) -> bool:
+    return time.time() - self.last_seen > self.idle_timeout
+
+  def handle(self, request: dict) -> dict:
+    self.last_seen = time.time()
+    op = request.get('op')
+    if op == 'ping':
+      return {'pid': os.getpid()}
+    if op == 'run':
+      rc, out, err = run_command(request['command'])
+      return {'rc': rc, 'out': out, 'err': err}
+    if op == 'check':
+      return self.check(request)
+    return {'error': f'Unknown [{op}] operation'}
+
+  def check(self, request: dict) -> dict:
+    session = request['session']
+    scanner = self.sessions.get(session)
+    # session continues only the same log window, other start point means new scan
+    origin = (request['since'], request.get('cursor'))
+    if scanner is None or self.origins[session] != origin:
+      scanner = JournalScanner(
+        run_command=run_command,
+        journalctl=request['journalctl'],
+        unit=request['unit'],
+        log_regexp=request.get('log_regexp'),
+        fail_regexps=request.get('log_fail_regexp'),
+        output=request.get('output', 'short-iso'),
+      )
+      scanner.reset(since=request['since'])
+      scanner.cursor = request.get('cursor')
+      self.sessions[session] = scanner
+      self.origins[session] = origin
+    self.touched[session] = time.time()
+    ports: set[int] = set()
+    port_list = set(request.get('port_list') or [])
+    ports_passed = calc_ports(
+      main_pid=int(request.get('main_pid') or 0),
+      result_ports=ports,
+      module_ports=port_list,
+    )
+    matched_from = len(scanner.matched_lines)
+    failed_from = len(scanner.failed_lines)
+    scanner.scan()
+    return {
+      'ports_passed': ports_passed,
+      'ports': sorted(ports),
+      'matched': scanner.matched,
+      'failed': scanner.failed,
+      'matched_lines': scanner.matched_lines[matched_from:],
+      'failed_lines': scanner.failed_lines[failed_from:],
+      'rc': scanner.rc,
+      'err': scanner.err,
+    }
+
+
+class HelperHandler(socketserver.StreamRequestHandler):
+  def handle(self) -> None:
+    try:
+      response = self.server.state.handle(  # type: ignore[reportAttributeAccessIssue]
+        json.loads(self.rfile.readline()),
+      )
+    except Exception as exc:  # noqa: BLE001
+      response = {'error': f'{exc}'}
+    self.wfile.write(json.dumps(response).encode() + b'\n')
+
+
+class HelperServer(socketserver.UnixStreamServer):
+  def __init__(self, socket_path: str, state: HelperState) -> None:
+    self.state = state
+    umask = os.umask(0o177)
+    try:
+      super().__init__(socket_path, HelperHandler)
+    finally:
+      os.umask(umask)
+    self.timeout = 1
+
+
+def serve(directory: str, idle_timeout: int) -> None:
+  socket_path = os.path.join(directory, HELPER_SOCKET)  # noqa: PTH118
+  with open(  # noqa: PTH123
+    os.path.join(directory, HELPER_LOCK),  # noqa: PTH118
+    'w',
+    encoding='utf-8',
+  ) as lock:
+    try:
+      fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+      return
+    with contextlib.suppress(FileNotFoundError):
+      os.unlink(socket_path)  # noqa: PTH108
+    server = HelperServer(socket_path, HelperState(idle_timeout))
+    try:
+      while not server.state.idle():
+        server.handle_request()
+        server.state.expire()
+    finally:
+      server.server_close()
+      with contextlib.suppress(FileNotFoundError):
+        os.unlink(socket_path)  # noqa: PTH108
+
+
+class HelperClient:
+  def __init__(self, path: str | None = None, idle_timeout: int = 300) -> None:
+    self.directory = state_dir(path)
+    self.socket_path = os.path.join(self.directory, HELPER_SOCKET)  # noqa: PTH118
+    self.idle_timeout = idle_timeout
+    self.available = False
+
+  def request(self, payload: dict) -> dict | None:
+    try:
+      with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(REQUEST_TIMEOUT)
+        sock.connect(self.socket_path)
+        sock.sendall(json.dumps(payload).encode() + b'\n')
+        data = sock.makefile('rb').readline()
+      response = json.loads(data) if data else None
+    except (OSError, ValueError):
+      response = None
+    if response is None or 'error' in response:
+      self.available = False
+      return None
+    self.available = True
+    return response
+
+  def run_command(self, command: str) -> tuple[int, str, str] | None:
+    response = self.request({'op': 'run', 'command': command})
+    if response is None:
+      return None
+    return response['rc'], response['out'], response['err']
+
+  def start(self) -> bool:
+    if self.request({'op': 'ping'}) is not None:
+      return True
+    os.makedirs(self.directory, mode=0o700, exist_ok=True)  # noqa: PTH103
+    pid = os.fork()
+    if pid == 0:
+      try:
+        self.daemonize()
+      finally:
+        os._exit(0)
+    os.waitpid(pid, 0)
+    deadline = time.time() + SPAWN_TIMEOUT
+    while time.time() < deadline:
+      if self.request({'op': 'ping'}) is not None:
+        return True
+      time.sleep(0.05)
+    return False
+
+  def daemonize(self) -> None:
+    os.setsid()
+    if os.fork() != 0:
+      return
+    os.chdir('/')
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in range(3):
+      os.dup2(devnull, fd)
+    serve(self.directory, self.idle_timeout)
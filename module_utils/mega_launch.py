@@ -1,11 +1,179 @@
 from __future__ import annotations
 
+import argparse
+import concurrent.futures
 import contextlib
+import functools
+import hashlib
+import json
+import mmap
+import os
+import random
+import re
+import shlex
+import shutil
+import signal
+import stat
+import subprocess  # noqa: S404
+import sys
+import syslog
+import time
+from pathlib import Path
+from typing import Callable, Protocol
 
 # pylint: disable=import-error
 import psutil  # type: ignore[reportMissingImports]
 
 
+def parse_systemctl_show(lines: list[str]) -> dict:
+  multival: list[str] = []
+  parsed = {}
+  key = ''
+  for line in lines:
+    if key:
+      continue
+    if '=' in line:
+      key, value = line.split('=', 1)
+      if key.startswith('Exec') and value.lstrip(
+      ).startswith('{') and not value.rstrip().endswith('}'):
+        multival.append(value)
+        continue
+      parsed[key] = value.strip()
+      key = ''
+    else:
+      multival.append(line)
+      if line.rstrip().endswith('}'):
+        parsed[key] = '\n'.join(multival).strip()
+        multival = []
+        key = ''
+  return parsed
+
+
+class Helper(Protocol):
+  def request(self, payload: dict) -> dict | None: ...
+
+  def run_command(self, command: str) -> tuple[int, str, str] | None: ...
+
+
+def run_command(command: str) -> tuple[int, str, str]:
+  proc = subprocess.run(  # noqa: S603
+    shlex.split(command),
+    capture_output=True,
+    text=True,
+    check=False,
+  )
+  return proc.returncode, proc.stdout, proc.stderr
+
+
+def state_dir(path: str | None = None) -> str:
+  return os.path.expanduser(  # noqa: PTH111
+    path or os.getenv('ANSIBLE_ASYNC_DIR') or '~/.ansible_async',
+  )
+
+
+def request_was_ignored(out: str) -> bool:
+  return '=' not in out and ('ignoring request' in out or 'ignoring command' in out)
+
+
+class ServiceStatus:
+  def __init__(
+    self,
+    unit: str,
+    run_command: Callable,
+    systemctl: str = 'systemctl',
+    helper: Helper | None = None,
+    properties: tuple[str, ...] = (),
+  ) -> None:
+    self.unit = unit
+    self.systemctl = systemctl
+    self.status: dict[str, str] | None = {}
+    command = f"{self.systemctl} show '{self.unit}'"
+    if properties:
+      command += f" --property={','.join(properties)}"
+    response = helper.run_command(command) if helper else None
+    self.rc, out, _ = response or run_command(command)
+    if self.rc != 0:
+      self.status = None
+    else:
+      self.status = parse_systemctl_show(f'{out}'.split('\n'))
+
+  def get(self, key: str, default: str | None = None) -> str | None:
+    if not self.status:
+      return default
+    return self.status.get(key, default)
+
+  def __getitem__(self, key: str) -> str:
+    if not self.status:
+      msg = f'Service [{self.unit}] status not available'
+      raise KeyError(msg)
+    return self.status[key]
+
+  def __contains__(self, key: str) -> bool:
+    if not self.status:
+      return False
+    return key in self.status
+
+  def __bool__(self) -> bool:
+    if not self.status or not isinstance(self.status, dict):
+      return False
+    return self.status.get('SubState') == 'running' \
+      and self.status.get('ActiveState') == 'active' \
+      and int(self.status.get('MainPID') or '0') > 0
+
+  def job(self) -> str:
+    # systemctl show omits Job when no job is queued for the unit
+    job = self.get('Job') or ''
+    return '' if job in {'', '0'} else job.split()[0]
+
+  def activating(self) -> bool:
+    return bool(self.job()) or self.get('ActiveState') in {'activating', 'reloading'}
+
+
+@functools.lru_cache(maxsize=16)
+def listen_process(main_pid: int) -> psutil.Process:
+  # keep process handles warm between polls of the same module run
+  return psutil.Process(main_pid)
+
+
+def cgroup_pids(path: str) -> set[int]:
+  # whole subtree, units with Delegate=yes keep processes in child cgroups only
+  pids: set[int] = set()
+  for directory, _, _ in os.walk(path):
+    with contextlib.suppress(OSError, ValueError), open(  # noqa: FURB101,PTH123
+      f'{directory}/cgroup.procs',
+      encoding='utf-8',
+    ) as procs:
+      pids.update(int(pid) for pid in procs.read().split())
+  return pids
+
+
+def unit_pids(
+  main_pid: int,
+  control_group: str | None,
+  cgroup_root: str = '/sys/fs/cgroup',
+) -> set[int]:
+  if control_group:
+    for hierarchy in ('', '/systemd'):
+      pids = cgroup_pids(f'{cgroup_root}{hierarchy}{control_group}')
+      if pids:
+        return pids
+  if main_pid <= 0:
+    return set()
+  pids = {main_pid}
+  with contextlib.suppress(psutil.Error):
+    pids.update(
+      child.pid for child in listen_process(main_pid).children(recursive=True)
+    )
+  return pids
+
+
+def listen_ports() -> set[int]:
+  return {
+    conn.laddr.port  # type: ignore[reportAttributeAccessIssue]
+    for conn in psutil.net_connections() if conn.status == psutil.CONN_LISTEN
+  }
+
+
 def calc_ports(
   main_pid: int,
   result_ports: set[int],
@@ -17,7 +185,7 @@ def calc_ports(
     result_ports.update({
       laddr.port
       for laddr in [
-        conn.laddr for conn in psutil.Process(main_pid).connections()
+        conn.laddr for conn in listen_process(main_pid).connections()
         if conn.status == psutil.CONN_LISTEN
       ]
     } if main_pid > 0 else {
@@ -34,3 +202,1385 @@ def calc_ports(
   else:
     def_res += int(module_ports.issubset(result_ports))
   return def_res
+
+
+class LogMatcher:
+  def __init__(
+    self,
+    log_regexp: str | None = None,
+    fail_regexps: list[str] | None = None,
+  ) -> None:
+    self.parser: re.Pattern[str] | None = re.compile(log_regexp) if log_regexp else None
+    self.fail_parsers: list[re.Pattern[str]] = [
+      re.compile(exp) for exp in fail_regexps or []
+    ]
+    self.matched_lines: list[str] = []
+    self.failed_lines: list[str] = []
+    self.since = 0.0
+    self.matched = False
+    self.failed = False
+    self.rc = 0
+    self.err = ''
+
+  def active(self) -> bool:
+    return bool(self.parser or self.fail_parsers)
+
+  def reset(self, since: float) -> None:
+    self.since = since
+    self.matched = False
+    self.failed = False
+
+  def feed(self, lines: list[str]) -> None:
+    line_matched = False
+    for line in lines:
+      if any(fail_parser.search(line) for fail_parser in self.fail_parsers):
+        self.failed_lines.append(line)
+        self.failed = True
+        break
+      if self.parser and not line_matched and self.parser.match(line):
+        self.matched_lines.append(line)
+        self.matched = line_matched = True
+
+
+class JournalScanner(LogMatcher):
+  def __init__(  # noqa: PLR0913,PLR0917
+    self,
+    run_command: Callable[[str], tuple[int, str, str]],
+    journalctl: str,
+    unit: str,
+    log_regexp: str | None = None,
+    fail_regexps: list[str] | None = None,
+    output: str = 'short-iso',
+  ) -> None:
+    super().__init__(log_regexp, fail_regexps)
+    self.run_command = run_command
+    self.journalctl = journalctl
+    self.unit = unit
+    self.output = output
+    self.cursor: str | None = None
+
+  def reset(self, since: float) -> None:
+    super().reset(since)
+    self.cursor = None
+
+  @staticmethod
+  def pop_cursor(lines: list[str]) -> str | None:
+    for index in range(len(lines) - 1, -1, -1):
+      if lines[index].startswith('-- cursor: '):
+        return lines.pop(index)[len('-- cursor: '):].strip()
+    return None
+
+  def mark(self) -> None:
+    # cursor of the last entry before start, scans continue right after it
+    if not self.active():
+      return
+    self.rc, out, self.err = self.run_command(
+      f"{self.journalctl} -q -t '{self.unit}' -n 1 -o cat --show-cursor",
+    )
+    if self.rc == 0:
+      self.cursor = self.pop_cursor(out.split('\n')) or self.cursor
+
+  def scan(self) -> bool:
+    if not self.active():
+      return False
+    command = (
+      f"{self.journalctl} -q -t '{self.unit}' -o {self.output} --show-cursor " +
+      (f"--after-cursor='{self.cursor}'" if self.cursor else f"-S '@{self.since:0.3f}'")
+    )
+    self.rc, out, self.err = self.run_command(command)
+    if self.rc != 0:
+      return False
+    lines = out.split('\n')
+    self.cursor = self.pop_cursor(lines) or self.cursor
+    self.feed(lines)
+    return self.matched
+
+  def update(self, response: dict) -> bool:
+    self.rc = response.get('rc', 0)
+    self.err = response.get('err', '')
+    self.matched = self.matched or bool(response.get('matched'))
+    self.failed = self.failed or bool(response.get('failed'))
+    self.matched_lines.extend(response.get('matched_lines', []))
+    self.failed_lines.extend(response.get('failed_lines', []))
+    return self.matched
+
+
+class FileTailer(LogMatcher):
+  def __init__(
+    self,
+    paths: list[str],
+    log_regexp: str | None = None,
+    fail_regexps: list[str] | None = None,
+    positions: dict | None = None,
+  ) -> None:
+    super().__init__(log_regexp, fail_regexps)
+    self.paths = paths
+    self.given = {
+      path: (int(position['inode']), int(position['offset']))
+      for path, position in (positions or {}).items()
+    }
+    self.positions: dict[str, dict[str, int]] = {}
+    self.handles: dict[str, int] = {}
+
+  def close(self) -> None:
+    for fd in self.handles.values():
+      os.close(fd)
+    self.handles.clear()
+
+  def reset(self, since: float) -> None:
+    # continue from given positions once, later tail lines written after reset
+    super().reset(since)
+    self.close()
+    self.positions.clear()
+    for path in self.paths:
+      with contextlib.suppress(OSError):
+        # descriptor opened now keeps the file if it is rotated before first scan
+        fd = self.handles[path] = os.open(path, os.O_RDONLY)
+        stat = os.fstat(fd)
+        inode, offset = self.given.get(path, (stat.st_ino, stat.st_size))
+        if inode != stat.st_ino:
+          # rotated since given positions, old file is not reachable by path
+          inode, offset = stat.st_ino, 0
+        self.positions[path] = {'inode': inode, 'offset': offset}
+    self.given.clear()
+
+  @staticmethod
+  def read(fd: int, offset: int) -> tuple[list[str], int]:
+    size = os.fstat(fd).st_size
+    if size <= offset:
+      return [], offset
+    with mmap.mmap(fd, size, access=mmap.ACCESS_READ) as data:
+      end = data.rfind(b'\n', offset, size) + 1
+      if end <= offset:
+        return [], offset
+      chunk = data[offset:end]
+    return chunk.decode('utf-8', 'replace').splitlines(), end
+
+  def tail(self, path: str) -> list[str]:
+    try:
+      stat = os.stat(path)  # noqa: PTH116
+    except OSError:
+      return []
+    position = self.positions.setdefault(path, {'inode': stat.st_ino, 'offset': 0})
+    lines: list[str] = []
+    fd = self.handles.get(path)
+    if position['inode'] != stat.st_ino:
+      # rotated: drain the old file through kept descriptor, then start new one
+      if fd is not None:
+        lines, _ = self.read(fd, position['offset'])
+        os.close(self.handles.pop(path))
+        fd = None
+      position.update({'inode': stat.st_ino, 'offset': 0})
+    elif stat.st_size < position['offset']:
+      position['offset'] = 0
+    if fd is None:
+      try:
+        fd = self.handles[path] = os.open(path, os.O_RDONLY)
+      except OSError:
+        return lines
+      if os.fstat(fd).st_ino != position['inode']:
+        position.update({'inode': os.fstat(fd).st_ino, 'offset': 0})
+    new_lines, position['offset'] = self.read(fd, position['offset'])
+    return lines + new_lines
+
+  def scan(self) -> bool:
+    if not self.active():
+      return False
+    lines: list[str] = []
+    for path in self.paths:
+      lines.extend(self.tail(path))
+    self.feed(lines)
+    return self.matched
+
+
+class RescueBackoff:
+  STRATEGIES = ('fixed', 'exponential', 'decorrelated')
+
+  def __init__(
+    self,
+    strategy: str = 'fixed',
+    base: float = 3,
+    cap: float = 60,
+  ) -> None:
+    self.strategy = strategy
+    self.base = base
+    self.cap = max(base, cap)
+    self.delays: list[float] = []
+    self.random = random.SystemRandom()
+
+  def next_delay(self) -> float:
+    if self.strategy == 'exponential':
+      # equal jitter keeps growth but spreads hosts across the upper half
+      ceiling = min(self.cap, self.base * 2**len(self.delays))
+      delay = ceiling / 2 + self.random.uniform(0, ceiling / 2)
+    elif self.strategy == 'decorrelated':
+      previous = self.delays[-1] if self.delays else self.base
+      delay = min(self.cap, self.random.uniform(self.base, previous * 3))
+    else:
+      delay = min(self.cap, self.base)
+    self.delays.append(round(delay, 3))
+    return self.delays[-1]
+
+
+class ResourceSettle:
+  def __init__(
+    self,
+    cpu: float | None = None,
+    io: int | None = None,
+    duration: float = 10,
+    cgroup_root: str = '/sys/fs/cgroup',
+    max_samples: int = 300,
+  ) -> None:
+    self.cpu = cpu
+    self.io = io
+    self.duration = duration
+    self.max_samples = max_samples
+    self.cgroup_root = cgroup_root
+    self.processes: dict[int, psutil.Process] = {}
+    self.samples: dict[str, list] = {'t': [], 'cpu': [], 'io': []}
+    self.started = time.time()
+    self.previous: tuple[float, float, int] | None = None
+    self.settled_since: float | None = None
+    self.sampled = 0
+
+  def reset(self) -> None:
+    self.processes.clear()
+    for column in self.samples.values():
+      column.clear()
+    self.started = time.time()
+    self.previous = None
+    self.settled_since = None
+
+  def totals(self, pids: set[int]) -> tuple[float, int]:
+    cpu = 0.0
+    io = 0
+    self.sampled = 0
+    for pid in set(self.processes) - pids:
+      del self.processes[pid]
+    for pid in pids:
+      with contextlib.suppress(psutil.Error):
+        process = self.processes.get(pid) or self.processes.setdefault(
+          pid,
+          psutil.Process(pid),
+        )
+        times = process.cpu_times()
+        cpu += times.user + times.system
+        self.sampled += 1
+        with contextlib.suppress(psutil.AccessDenied, AttributeError):
+          counters = process.io_counters()
+          io += counters.read_bytes + counters.write_bytes
+    return cpu, io
+
+  def sample(self, main_pid: int, control_group: str | None = None) -> bool:
+    now = time.time()
+    cpu, io = self.totals(unit_pids(main_pid, control_group, self.cgroup_root))
+    if not self.sampled:
+      # nothing alive to measure is not calm, baseline starts over with processes
+      self.previous = None
+      self.settled_since = None
+      return False
+    if self.previous is not None and now > self.previous[0]:
+      elapsed = now - self.previous[0]
+      cpu_rate = max(cpu - self.previous[1], 0) / elapsed * 100
+      io_rate = max(io - self.previous[2], 0) / elapsed
+      self.samples['t'].append(round(now - self.started, 2))
+      self.samples['cpu'].append(round(cpu_rate, 1))
+      self.samples['io'].append(round(io_rate))
+      for column in self.samples.values():
+        del column[:-self.max_samples]
+      calm = (self.cpu is None or cpu_rate <= self.cpu) and (
+        self.io is None or io_rate <= self.io
+      )
+      if not calm:
+        self.settled_since = None
+      elif self.settled_since is None:
+        self.settled_since = self.previous[0]
+    self.previous = (now, cpu, io)
+    return self.settled_since is not None and now - self.settled_since >= self.duration
+
+
+class NotifyCheck:
+  def __init__(
+    self,
+    ready: bool = False,  # noqa: FBT001,FBT002
+    status_regexp: str | None = None,
+  ) -> None:
+    self.ready = ready
+    self.parser: re.Pattern[str] | None = (
+      re.compile(status_regexp) if status_regexp else None
+    )
+    self.status_text = ''
+
+  def active(self) -> bool:
+    return self.ready or self.parser is not None
+
+  def check(self, status: ServiceStatus) -> bool:
+    # READY=1 moves notify unit from activating to active, STATUS= is StatusText
+    self.status_text = status.get('StatusText') or ''
+    if self.ready and (
+      status.get('Type') != 'notify' or status.get('ActiveState') != 'active'
+    ):
+      return False
+    return self.parser is None or bool(self.parser.search(self.status_text))
+
+
+class CacheWarmer:
+  def __init__(  # noqa: PLR0913,PLR0917
+    self,
+    paths: list[str],
+    budget: int = 0,
+    workers: int = 4,
+    method: str = 'read',
+    chunk: int = 2**23,
+    timeout: int = 0,
+  ) -> None:
+    self.paths = paths
+    self.budget = budget
+    self.timeout = timeout
+    self.deadline: float | None = None
+    self.timed_out = False
+    self.workers = max(workers, 1)
+    self.method = method if hasattr(os, 'posix_fadvise') else 'read'
+    self.chunk = chunk
+    self.files = 0
+    self.bytes = 0
+    self.requested = 0
+    self.elapsed = 0.0
+    self.errors: list[str] = []
+
+  def plan(self) -> list[tuple[Path, int]]:
+    # files in given order, directories walked, cut by byte budget
+    planned: list[tuple[Path, int]] = []
+    remain = self.budget or -1
+    for path in map(Path, self.paths):
+      try:
+        walked = sorted(path.rglob('*')) if path.is_dir() else [path]
+      except OSError as e:
+        self.errors.append(f'{path}: {e.strerror}')
+        continue
+      for file in walked:
+        try:
+          status = file.stat()
+        except OSError as e:
+          self.errors.append(f'{file}: {e.strerror}')
+          continue
+        size = status.st_size
+        if not stat.S_ISREG(status.st_mode) or not size:
+          continue
+        if remain >= 0:
+          size = min(size, remain)
+          remain -= size
+        planned.append((file, size))
+        if not remain:
+          return planned
+    return planned
+
+  def expired(self) -> bool:
+    if self.deadline is not None and time.time() >= self.deadline:
+      self.timed_out = True
+    return self.timed_out
+
+  def warm(self, file: Path, size: int) -> int | None:
+    # files left after timeout are skipped, reads stop at chunk boundary
+    if self.expired():
+      return None
+    fd = os.open(file, os.O_RDONLY)
+    try:
+      if self.method == 'fadvise':
+        # kernel reads ahead in background, nothing is warmed yet on return
+        os.posix_fadvise(fd, 0, size, os.POSIX_FADV_WILLNEED)
+        return 0
+      done = 0
+      while done < size and not self.expired():
+        data = os.read(fd, min(self.chunk, size - done))
+        if not data:
+          break
+        done += len(data)
+      return done
+    finally:
+      os.close(fd)
+
+  def run(self) -> int:
+    started = time.time()
+    if self.timeout > 0:
+      self.deadline = started + self.timeout
+    planned = self.plan()
+    with concurrent.futures.ThreadPoolExecutor(self.workers) as pool:
+      futures = {
+        pool.submit(self.warm, file, size): (file, size) for file, size in planned
+      }
+      for future in concurrent.futures.as_completed(futures):
+        file, size = futures[future]
+        error = future.exception()
+        if isinstance(error, OSError):
+          self.errors.append(f'{file}: {error.strerror}')
+        elif error is not None:
+          raise error
+        elif future.result() is not None:
+          self.bytes += future.result()
+          self.requested += size
+          self.files += 1
+    self.elapsed = round(time.time() - started, 3)
+    return self.bytes
+
+  def report(self) -> dict:
+    return {
+      'files': self.files,
+      'bytes': self.bytes,
+      'requested': self.requested,
+      'elapsed': self.elapsed,
+      'method': self.method,
+      'timed_out': self.timed_out,
+      'errors': self.errors,
+    }
+
+
+class VerdictCache:
+  def __init__(self, directory: str, unit: str, params: dict, ttl: int = 300) -> None:
+    self.path = Path(directory) / f'verdict-{unit}.json'
+    self.unit = unit
+    self.ttl = ttl
+    self.digest = hashlib.sha256(
+      json.dumps(params, sort_keys=True, default=sorted).encode(),
+    ).hexdigest()
+    self.verdict: dict = {}
+    self.age: float | None = None
+
+  def key(self, invocation: str) -> str:
+    return f'{self.unit}:{invocation}:{self.digest}'
+
+  def lookup(self, invocation: str) -> bool:
+    # same service run checked with the same parameters recently enough
+    self.verdict = {}
+    self.age = None
+    if not invocation or self.ttl <= 0:
+      return False
+    try:
+      cached = json.loads(self.path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+      return False
+    age = time.time() - cached.get('time', 0)
+    if cached.get('key') != self.key(invocation) or not 0 <= age <= self.ttl:
+      return False
+    self.verdict = cached.get('verdict', {})
+    self.age = round(age, 3)
+    return True
+
+  def store(self, invocation: str, verdict: dict) -> bool:
+    if not invocation or self.ttl <= 0:
+      return False
+    temp = self.path.with_suffix(f'.{os.getpid()}')
+    try:
+      self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+      temp.write_text(
+        json.dumps(
+          {'key': self.key(invocation), 'time': time.time(), 'verdict': verdict},
+          default=sorted,
+        ),
+        encoding='utf-8',
+      )
+      temp.replace(self.path)
+    except OSError:
+      temp.unlink(missing_ok=True)
+      return False
+    return True
+
+  def drop(self) -> None:
+    with contextlib.suppress(OSError):
+      self.path.unlink(missing_ok=True)
+
+
+class LaunchError(Exception):
+  def __init__(self, msg: str, **result) -> None:  # noqa: ANN003
+    super().__init__(msg)
+    self.result = {**result, 'msg': msg}
+
+
+LAUNCH_DEFAULTS: dict = {
+  'name': None,
+  'wait_timeout': 77,
+  'max_rescues': 3,
+  'rescue_delay': 3,
+  'rescue_backoff': 'fixed',
+  'rescue_delay_max': 60,
+  'retry_delay': 1,
+  'port_list': None,
+  'log_regexp': None,
+  'log_fail_regexp': None,
+  'log_fail_fatal': False,
+  'log_file': None,
+  'notify_ready': False,
+  'status_regexp': None,
+  'settle_cpu': None,
+  'settle_io': None,
+  'settle_duration': 10,
+  'warmup_paths': None,
+  'warmup_budget': 0,
+  'warmup_workers': 4,
+  'warmup_method': 'read',
+  'warmup_timeout': 0,
+  'required_checks': 2,
+  'verdict_ttl': 0,
+  'verdict_dir': None,
+  'state': 'started',
+  'no_block': False,
+  'stop_timeout': 30,
+  'murder_delay': 2,
+  'epoch': None,
+  'scope': 'system',
+  'instances': None,
+  'port_step': 0,
+  'wave_size': 5,
+  'failure_threshold': 0,
+}
+CHECK_DEFAULTS: dict = {
+  'name': None,
+  'main_pid': None,
+  'port_list': None,
+  'log_epoch': None,
+  'log_regexp': None,
+  'log_fail_regexp': None,
+  'log_fail_fatal': False,
+  'log_file': None,
+  'log_positions': None,
+  'notify_ready': False,
+  'status_regexp': None,
+  'wait_timeout': 0,
+  'retry_delay': 1,
+  'required_checks': 2,
+  'instances': None,
+  'port_step': 0,
+  'wave_size': 5,
+  'failure_threshold': 0,
+}
+PROBE_PROPERTIES = ('ActiveState', 'SubState', 'MainPID', 'InvocationID')
+POLL_PROPERTIES = (*PROBE_PROPERTIES, 'ControlGroup', 'Type', 'StatusText')
+JOB_PROPERTIES = (*POLL_PROPERTIES, 'Job', 'Result')
+
+
+def log_source(
+  params: dict,
+  run_command: Callable,
+  journalctl: str,
+  unit: str,
+  output: str = 'short-iso',
+) -> LogMatcher:
+  if params['log_file']:
+    return FileTailer(
+      paths=params['log_file'],
+      log_regexp=params['log_regexp'],
+      fail_regexps=params['log_fail_regexp'],
+      positions=params.get('log_positions'),
+    )
+  return JournalScanner(
+    run_command=run_command,
+    journalctl=journalctl,
+    unit=unit,
+    log_regexp=params['log_regexp'],
+    fail_regexps=params['log_fail_regexp'],
+    output=output,
+  )
+
+
+def check_unit_name(unit: str) -> None:
+  for globpattern in (r'*', r'?', r'['):
+    if globpattern in unit:
+      msg = (
+        'This module does not currently support using glob patterns, found '
+        f'[{globpattern}] in [{unit}] service'
+      )
+      raise LaunchError(msg)
+
+
+def open_log(unit: str, epoch: str | None) -> None:
+  syslog.openlog(
+    f'mega-launch-{unit}{"" if epoch is None else f"-{epoch}"}',
+    0,
+    getattr(syslog, 'LOG_USER', syslog.LOG_USER),
+  )
+
+
+def runtime_dir() -> None:
+  if os.getenv('XDG_RUNTIME_DIR') is None:
+    os.environ['XDG_RUNTIME_DIR'] = f'/run/user/{os.geteuid()}'
+
+
+class Launcher:
+  def __init__(  # noqa: PLR0913,PLR0917
+    self,
+    params: dict,
+    run_command: Callable = run_command,
+    systemctl: str = 'systemctl',
+    journalctl: str = 'journalctl',
+    check_mode: bool = False,  # noqa: FBT001,FBT002
+    helper: Helper | None = None,
+  ) -> None:
+    self.params = {**LAUNCH_DEFAULTS, **params}
+    self.unit: str = self.params['name']
+    check_unit_name(self.unit)
+    self.run_command = run_command
+    self.check_mode = check_mode
+    self.helper = helper
+    # instances of wave share syslog ident opened by WaveRunner
+    self.wave: str | None = self.params.get('wave')
+    scope = self.params['scope']
+    self.systemctl = systemctl if scope == 'system' else f'{systemctl} --{scope}'
+    self.journalctl = journalctl if scope == 'system' else f'{journalctl} --{scope}'
+    runtime_dir()
+    self.is_systemd = False
+    self.result: dict = {
+      'changed': False,
+      'passed_checks': 0,
+      'ports': set(),
+      'matched_lines': [],
+    }
+    self.verdicts: VerdictCache | None = None
+    if self.params['verdict_ttl'] > 0:
+      self.verdicts = VerdictCache(
+        directory=state_dir(self.params['verdict_dir']),
+        unit=self.unit,
+        params={
+          **{
+            key: self.params[key] for key in (
+              'scope', 'log_regexp', 'log_fail_regexp', 'log_file', 'notify_ready',
+              'status_regexp', 'settle_cpu', 'settle_io', 'settle_duration',
+              'required_checks',
+            )
+          },
+          'port_list': sorted(self.params['port_list'] or []),
+        },
+        ttl=self.params['verdict_ttl'],
+      )
+
+  def log(self, priority: int, message: str) -> None:
+    syslog.syslog(priority, f'[{self.unit}] {message}' if self.wave else message)
+
+  def status(self, properties: tuple[str, ...] = ()) -> ServiceStatus:
+    return ServiceStatus(
+      self.unit,
+      self.run_command,
+      self.systemctl,
+      helper=self.helper,
+      properties=properties,
+    )
+
+  def cached(self) -> bool:
+    if not self.verdicts or self.params['state'] == 'restarted':
+      return False
+    probe = ServiceStatus(
+      self.unit,
+      self.run_command,
+      self.systemctl,
+      properties=PROBE_PROPERTIES,
+    )
+    if not probe or not self.verdicts.lookup(probe.get('InvocationID') or ''):
+      return False
+    self.result = {
+      'changed': False,
+      'cached': True,
+      'verdict_age': self.verdicts.age,
+      'status': probe.status,
+      **self.verdicts.verdict,
+    }
+    return True
+
+  def discover(self) -> bool:
+    # systemd_service from Ansible part begin
+    unit = self.unit
+    systemctl = self.systemctl
+    self.result['status'] = {}
+    rc, out, err = self.run_command(f"{systemctl} show '{unit}'")
+    if rc == 0 and not (request_was_ignored(out) or request_was_ignored(err)):
+      if out:
+        status = self.result['status'] = parse_systemctl_show(f'{out}'.split('\n'))
+        self.is_systemd = status.get('LoadState', 'not-found') != 'not-found'
+        is_masked = status.get('LoadState') == 'masked'
+        if self.is_systemd and not is_masked and 'LoadError' in status:
+          msg = f"Error loading unit file '{unit}': {status['LoadError']}"
+          raise LaunchError(msg)
+    elif err and rc == 1 and 'Failed to parse bus message' in err:
+      self.result['status'] = parse_systemctl_show(f'{out}'.split('\n'))
+      unit_base, sep, _suffix = unit.partition('@')
+      unit_search = f'{unit_base}{sep}'
+      rc, out, err = self.run_command(f"{systemctl} list-unit-files '{unit_search}*'")
+      self.is_systemd = unit_search in out
+      rc, out, err = self.run_command(f"{systemctl} is-active '{unit}'")
+      self.result['status']['ActiveState'] = out.rstrip('\n')
+    else:
+      valid_enabled_states = [
+        'enabled',
+        'enabled-runtime',
+        'linked',
+        'linked-runtime',
+        'masked',
+        'masked-runtime',
+        'static',
+        'indirect',
+        'disabled',
+        'generated',
+        'transient',
+      ]
+      rc, out, err = self.run_command(f"{systemctl} is-enabled '{unit}'")
+      if out.strip() in valid_enabled_states:
+        self.is_systemd = True
+      else:
+        rc, out, err = self.run_command(f"{systemctl} list-unit-files '{unit}'")
+        if rc == 0:
+          self.is_systemd = True
+        else:
+          rc, out, err = self.run_command(systemctl)
+          if rc != 0:
+            raise LaunchError(err or out, rc=rc, stdout=out, stderr=err)
+    # systemd_service from Ansible part end
+    return self.is_systemd
+
+  def stop(self, status: ServiceStatus, port_list: set[int]) -> None:
+    # stop running unit, make sure its processes exited and ports are released
+    phase_epoch = time.time()
+    # handles check process create time, so reused pid is never waited or signalled
+    processes: list[psutil.Process] = []
+    for pid in unit_pids(int(status.get('MainPID') or '0'), status.get('ControlGroup')):
+      with contextlib.suppress(psutil.Error):
+        processes.append(psutil.Process(pid))
+    rc, _, err = self.run_command(f"{self.systemctl} stop '{self.unit}'")
+    if rc != 0:
+      msg = f'Unable to stop service {self.unit}: {err}'
+      raise LaunchError(msg)
+    _, alive = psutil.wait_procs(processes, timeout=self.params['murder_delay'])
+    for sig in (signal.Signals.SIGTERM, signal.Signals.SIGKILL):
+      if not alive:
+        break
+      self.log(
+        syslog.LOG_WARNING,
+        f'send [{sig.name}] to stuck {sorted(process.pid for process in alive)}',
+      )
+      for process in alive:
+        with contextlib.suppress(psutil.Error):
+          process.send_signal(sig)
+      _, alive = psutil.wait_procs(alive, timeout=self.params['murder_delay'])
+    deadline = phase_epoch + self.params['stop_timeout']
+    busy = listen_ports() & port_list
+    while (alive or busy) and time.time() < deadline:
+      if alive:
+        _, alive = psutil.wait_procs(alive, timeout=0.1)
+      else:
+        time.sleep(0.1)
+      busy = listen_ports() & port_list
+    self.result['timings']['stop'] = round(time.time() - phase_epoch, 3)
+    if alive or busy:
+      msg = (
+        f'Service {self.unit} processes {sorted(process.pid for process in alive)} '
+        f'or ports {sorted(busy)} still busy after [{self.params["stop_timeout"]}] '
+        'seconds'
+      )
+      raise LaunchError(msg, **self.result)
+
+  def warmup(self) -> None:
+    warmer = CacheWarmer(
+      paths=self.params['warmup_paths'],
+      budget=self.params['warmup_budget'],
+      workers=self.params['warmup_workers'],
+      method=self.params['warmup_method'],
+      timeout=self.params['warmup_timeout'],
+    )
+    warmer.run()
+    self.result['warmup'] = warmer.report()
+    self.result['timings']['warmup'] = warmer.elapsed
+    self.log(
+      syslog.LOG_INFO,
+      f'warmed [{warmer.bytes}] bytes of [{warmer.files}] files '
+      f'in [{warmer.elapsed}] seconds',
+    )
+
+  def launch(self) -> dict:  # noqa: C901,PLR0912,PLR0914,PLR0915
+    params = self.params
+    result = self.result
+    unit = self.unit
+    systemctl = self.systemctl
+    if 'ActiveState' not in result['status']:
+      msg = 'Unknown service state'
+      raise LaunchError(msg, status=result['status'])
+    current_retry = 0
+    scanner = log_source(params, self.run_command, self.journalctl, unit)
+    journal = isinstance(scanner, JournalScanner)
+    result['matched_lines'] = scanner.matched_lines
+    result['failed_lines'] = scanner.failed_lines
+    if isinstance(scanner, FileTailer):
+      result['log_positions'] = scanner.positions
+    notify = NotifyCheck(params['notify_ready'], params['status_regexp'])
+    if notify.ready and result['status'].get('Type') != 'notify':
+      msg = (
+        f'notify_ready requires Type=notify unit, [{unit}] is '
+        f'[{result["status"].get("Type")}]'
+      )
+      raise LaunchError(msg)
+    settle: ResourceSettle | None = None
+    if params['settle_cpu'] is not None or params['settle_io'] is not None:
+      settle = ResourceSettle(
+        cpu=params['settle_cpu'],
+        io=params['settle_io'],
+        duration=params['settle_duration'],
+      )
+      result['settle'] = settle.samples
+    result['helper'] = self.helper is not None
+    epoch = params['epoch']
+    if not self.wave:
+      open_log(unit, epoch)
+    running_before = self.status(POLL_PROPERTIES)
+    backoff = RescueBackoff(
+      strategy=params['rescue_backoff'],
+      base=params['rescue_delay'],
+      cap=params['rescue_delay_max'],
+    )
+    port_list = set(params['port_list'] or [])
+    no_block = params['no_block']
+    properties = JOB_PROPERTIES if no_block else POLL_PROPERTIES
+    result['rescue_delays'] = backoff.delays
+    result['rescues'] = 0
+    result['timings'] = {'start': 0.0, 'checks': 0.0, 'rescue': 0.0}
+    if self.verdicts:
+      result['cached'] = False
+    launch_epoch = time.time()
+    restart = params['state'] == 'restarted' and bool(running_before)
+    if params['warmup_paths'] and (restart or not running_before) and not self.check_mode:
+      self.warmup()
+    last_ready: float | None = None
+    if restart:
+      if self.check_mode:
+        result['changed'] = True
+        return result
+      # downtime window opens when running service is being stopped
+      last_ready = time.time()
+      result['downtimes'] = []
+      self.stop(running_before, port_list)
+      running_before = self.status(POLL_PROPERTIES)
+    while (
+      result['passed_checks'] < params['required_checks']
+      and current_retry < params['max_rescues']
+    ):
+      current_retry += 1
+      result['passed_checks'] = 0
+      scanner.reset(since=time.time() - 1)
+      if journal:
+        scanner.mark()
+      if settle:
+        settle.reset()
+      phase_epoch = time.time()
+      if not self.check_mode:
+        rc, _, err = self.run_command(
+          f"{systemctl} start {'--no-block ' if no_block else ''}'{unit}'",
+        )
+        if rc != 0:
+          msg = f'Unable to start service {unit}: {err}'
+          raise LaunchError(msg)
+      running_service = self.status(properties)
+      job = running_service.job()
+      if not running_service and not (no_block and running_service.activating()):
+        if self.check_mode:
+          result['changed'] = True
+          return result
+        msg = f'Service {unit} unable to start'
+        raise LaunchError(msg)
+      result['timings']['start'] += time.time() - phase_epoch
+      self.log(
+        syslog.LOG_INFO,
+        f'retry [{current_retry}/{params["max_rescues"]}] '
+        f'{"check_mode" if self.check_mode else "start"}'
+        f' [{unit}] service',
+      )
+      check_epoch = time.time()
+      while (
+        result['passed_checks'] < params['required_checks']
+        and time.time() - check_epoch < params['wait_timeout']
+        and (running_service or (no_block and running_service.activating()))
+        and not scanner.failed
+      ):
+        running_service = self.status(properties)
+        main_pid = int(running_service.get('MainPID', '0') or '0')
+        if job and not running_service.job():
+          # start job is done, systemd failed it when unit is not running now
+          job = ''
+          result['activation'] = round(time.time() - phase_epoch, 3)
+          if not running_service:
+            msg = (
+              f'Unable to start service {unit}: start job failed with '
+              f'[{running_service.get("Result")}] result'
+            )
+            raise LaunchError(msg, **result)
+        response = self.helper.request({
+          'op': 'check',
+          'session': f'launch-{unit}-{epoch}-{os.getpid()}-{current_retry}',
+          'journalctl': self.journalctl,
+          'unit': unit,
+          'since': scanner.since,
+          'cursor': scanner.cursor if journal else None,
+          'main_pid': main_pid,
+          'port_list': sorted(port_list),
+          'log_regexp': params['log_regexp'] if journal else None,
+          'log_fail_regexp': params['log_fail_regexp'] if journal else None,
+        }) if self.helper else None
+        if response is not None:
+          result['passed_checks'] = response['ports_passed'] if (
+            main_pid > 0 or not no_block
+          ) else 0
+          result['ports'] = set(response['ports'])
+          log_exp_matched = scanner.update(response) if journal else scanner.scan()
+        else:
+          # no main process yet while queued start job waits for its turn
+          result['passed_checks'] = calc_ports(
+            main_pid=main_pid,
+            result_ports=result['ports'],
+            module_ports=port_list,
+          ) if main_pid > 0 or not no_block else 0
+          log_exp_matched = scanner.scan()
+        if scanner.rc != 0:
+          msg = f"Unable journalctl -t '{unit}': {scanner.err}"
+          raise LaunchError(msg)
+        if scanner.failed:
+          self.log(
+            syslog.LOG_WARNING,
+            f'failure log line [{scanner.failed_lines[-1]}] aborts attempt',
+          )
+          result['passed_checks'] = 0
+          break
+        result['passed_checks'] += int(log_exp_matched)
+        if notify.active():
+          result['passed_checks'] += int(notify.check(running_service))
+          result['status_text'] = notify.status_text
+        if settle:
+          result['passed_checks'] += int(
+            settle.sample(main_pid, running_service.get('ControlGroup')),
+          )
+        self.log(
+          syslog.LOG_INFO,
+          f'remain [{params["wait_timeout"] - time.time() + check_epoch:.2f}] seconds ['
+          f'{result["passed_checks"]}/{params["required_checks"]}] checks',
+        )
+        if result['passed_checks'] >= params['required_checks']:
+          break
+        time.sleep(params['retry_delay'])
+      self.log(syslog.LOG_INFO, 'loop 2 exit')
+      result['timings']['checks'] += time.time() - check_epoch
+      if last_ready is not None:
+        result['downtimes'].append(round(time.time() - last_ready, 3))
+      if result['passed_checks'] < params['required_checks']:
+        phase_epoch = time.time()
+        if not self.check_mode and not running_before:
+          rc, _, err = self.run_command(f"{systemctl} stop '{unit}'")
+          if rc != 0:
+            msg = f'Unable to stop service {unit}: {err}'
+            raise LaunchError(msg)
+        self.log(
+          syslog.LOG_INFO,
+          f'not enough [{result["passed_checks"]}/{params["required_checks"]}]'
+          f' checks, [{unit}] '
+          f'{"check_mode" if self.check_mode else "stopped"}',
+        )
+        if scanner.failed and params['log_fail_fatal']:
+          result['fatal'] = True
+          msg = (
+            f'Fatal log line [{scanner.failed_lines[-1]}] found, giving up without '
+            'further rescues'
+          )
+          raise LaunchError(msg, **result)
+        if current_retry < params['max_rescues']:
+          rescue_delay = backoff.next_delay()
+          self.log(syslog.LOG_INFO, f'delay [{rescue_delay}] seconds before restart')
+          time.sleep(rescue_delay)
+          result['rescues'] = current_retry
+        result['timings']['rescue'] += time.time() - phase_epoch
+    if result['passed_checks'] < params['required_checks']:
+      if self.verdicts:
+        self.verdicts.drop()
+      result['changed'] = False
+      msg = (
+        f'Passed checks [{result["passed_checks"]}] less '
+        f'than [{params["required_checks"]}] required checks'
+      )
+      raise LaunchError(msg, **result)
+    if not running_before:
+      result['changed'] = True
+    result['time_to_ready'] = round(time.time() - launch_epoch, 3)
+    if last_ready is not None:
+      result['downtime'] = result['downtimes'][-1]
+    if self.verdicts and not self.check_mode:
+      self.verdicts.store(
+        self.status(PROBE_PROPERTIES).get('InvocationID') or '',
+        {key: result[key] for key in ('passed_checks', 'ports', 'matched_lines')},
+      )
+    if not self.wave:
+      syslog.closelog()
+    return result
+
+  def run(self) -> dict:
+    if self.cached():
+      return self.result
+    if not self.discover():
+      msg = f'Could not find the requested service {self.unit}: host'
+      raise LaunchError(msg)
+    return self.launch()
+
+
+class Checker:
+  def __init__(
+    self,
+    params: dict,
+    run_command: Callable = run_command,
+    journalctl: str = 'journalctl',
+    helper: Helper | None = None,
+    systemctl: str = 'systemctl',
+  ) -> None:
+    self.params = {**CHECK_DEFAULTS, **params}
+    self.unit: str = self.params['name']
+    # given log_epoch shares helper session between polls of the same start
+    self.session = f'check-{self.unit}-{self.params["log_epoch"]}'
+    if self.params['log_epoch'] is None:
+      self.params['log_epoch'] = int(time.time())
+      self.session = f'check-{self.unit}-{self.params["log_epoch"]}-{os.getpid()}'
+    check_unit_name(self.unit)
+    self.run_command = run_command
+    self.journalctl = journalctl
+    self.systemctl = systemctl
+    self.helper = helper
+    self.notify = NotifyCheck(self.params['notify_ready'], self.params['status_regexp'])
+    self.result: dict = {
+      'changed': False,
+      'passed_checks': 0,
+      'ports': set(),
+      'matched_lines': [],
+      'failed_lines': [],
+      'fatal': False,
+      'polls': 0,
+    }
+    self.scanner: LogMatcher | None = None
+    if self.params['log_regexp'] or self.params['log_fail_regexp'] or self.params[
+      'log_file'
+    ]:
+      runtime_dir()
+      self.scanner = log_source(self.params, run_command, journalctl, self.unit, 'short')
+      if isinstance(self.scanner, FileTailer):
+        self.result['log_positions'] = self.scanner.positions
+      self.result['matched_lines'] = self.scanner.matched_lines
+      self.result['failed_lines'] = self.scanner.failed_lines
+      self.scanner.reset(since=self.params['log_epoch'] - 1)
+
+  def run(self) -> dict:
+    params = self.params
+    result = self.result
+    scanner = self.scanner
+    journal = isinstance(scanner, JournalScanner)
+    unit = self.unit
+    port_list = set(params['port_list'] or [])
+    main_pid = params['main_pid']
+    if main_pid is None and port_list:
+      # 0 means ports must be free, unknown owner is the running unit main process
+      main_pid = ServiceStatus(
+        unit,
+        self.run_command,
+        self.systemctl,
+        properties=PROBE_PROPERTIES,
+      ).get('MainPID')
+    main_pid = int(main_pid or 0)
+    result['helper'] = self.helper is not None
+    check_epoch = time.time()
+    deadline = check_epoch + params['wait_timeout']
+    while True:
+      result['polls'] += 1
+      response = self.helper.request({
+        'op': 'check',
+        'session': self.session,
+        'journalctl': self.journalctl if journal else '',
+        'unit': unit,
+        'since': params['log_epoch'] - 1,
+        'main_pid': main_pid,
+        'port_list': sorted(port_list),
+        'log_regexp': params['log_regexp'] if journal else None,
+        'log_fail_regexp': params['log_fail_regexp'] if journal else None,
+        'output': 'short',
+      }) if self.helper else None
+      if response is not None:
+        result['passed_checks'] = response['ports_passed'] if port_list else 0
+        result['ports'] = set(response['ports'])
+        log_regexp_matched = (
+          scanner.update(response) if journal else bool(scanner and scanner.scan())
+        )
+      else:
+        result['passed_checks'] = calc_ports(
+          main_pid=main_pid,
+          result_ports=result['ports'],
+          module_ports=port_list,
+        ) if port_list else 0
+        log_regexp_matched = scanner.scan() if scanner else False
+      if scanner:
+        if scanner.rc != 0:
+          msg = f"Unable journalctl -t '{unit}': {scanner.err}"
+          raise LaunchError(msg)
+        if scanner.failed:
+          result['passed_checks'] = 0
+          result['fatal'] = params['log_fail_fatal']
+          result['elapsed'] = round(time.time() - check_epoch, 3)
+          msg = f'Failure log line [{scanner.failed_lines[-1]}] found'
+          raise LaunchError(msg, **result)
+        result['passed_checks'] += int(log_regexp_matched)
+      if self.notify.active():
+        result['passed_checks'] += int(self.notify.check(ServiceStatus(
+          unit,
+          self.run_command,
+          self.systemctl,
+          helper=self.helper,
+          properties=POLL_PROPERTIES,
+        )))
+        result['status_text'] = self.notify.status_text
+      if (
+        result['passed_checks'] >= params['required_checks']
+        or time.time() + params['retry_delay'] > deadline
+      ):
+        break
+      time.sleep(params['retry_delay'])
+    result['elapsed'] = round(time.time() - check_epoch, 3)
+    return result
+
+
+def is_pattern(unit: str, instances: list | None = None) -> bool:
+  return bool(instances) or any(char in unit for char in '*?[')
+
+
+def expand_instances(instances: list) -> list[str]:
+  expanded: list[str] = []
+  for instance in instances:
+    first, sep, last = f'{instance}'.partition('..')
+    if sep and first.isdigit() and last.isdigit():
+      expanded.extend(f'{number}' for number in range(int(first), int(last) + 1))
+    else:
+      expanded.append(f'{instance}')
+  return list(dict.fromkeys(expanded))
+
+
+def natural_key(unit: str) -> list:
+  return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', unit)]
+
+
+def expand_units(
+  unit: str,
+  instances: list | None,
+  run_command: Callable,
+  systemctl: str,
+) -> list[str]:
+  base = unit[:-len('.service')] if unit.endswith('.service') else unit
+  if instances:
+    if not base.endswith('@'):
+      msg = f'Instances require template unit like [name@], got [{unit}]'
+      raise LaunchError(msg)
+    return [f'{base}{instance}' for instance in expand_instances(instances)]
+  units: set[str] = set()
+  # loaded instances come from list-units, never started ones only from unit files
+  for verb in ('list-units --all', 'list-unit-files'):
+    rc, out, err = run_command(
+      f"{systemctl} {verb} --plain --no-legend --type=service '{base}.service'",
+    )
+    if rc != 0:
+      msg = f'Unable to list units matching [{unit}]: {err}'
+      raise LaunchError(msg)
+    for line in f'{out}'.splitlines():
+      name = line.split()[0] if line.strip() else ''
+      if name.endswith('.service') and not name.endswith('@.service'):
+        units.add(name[:-len('.service')])
+  if not units:
+    msg = f'No units match [{unit}] pattern'
+    raise LaunchError(msg)
+  return sorted(units, key=natural_key)
+
+
+def instance_ports(
+  port_list: list[int] | None,
+  unit: str,
+  index: int,
+  port_step: int,
+) -> list[int] | None:
+  # numeric instances keep their ports whatever subset of them is launched
+  instance = unit.partition('@')[2]
+  offset = int(instance) if instance.isdigit() else index
+  return [port + offset * port_step for port in port_list] if port_list else port_list
+
+
+class WaveRunner:
+  def __init__(
+    self,
+    params: dict,
+    run_command: Callable = run_command,
+    systemctl: str = 'systemctl',
+  ) -> None:
+    self.params = params
+    self.run_command = run_command
+    scope = params.get('scope') or 'system'
+    self.systemctl = systemctl if scope == 'system' else f'{systemctl} --{scope}'
+    self.units = expand_units(
+      params['name'], params['instances'], run_command, self.systemctl,
+    )
+    self.wave_size = max(params['wave_size'], 1)
+    self.failure_threshold = params['failure_threshold']
+    self.results: dict[str, dict] = {}
+    self.failed: list[str] = []
+    self.skipped: list[str] = []
+    self.waves: list[list[str]] = []
+
+  def instance_params(self, unit: str, index: int) -> dict:
+    params = {
+      **self.params,
+      'name': unit,
+      'wave': self.params['name'],
+      'port_list': instance_ports(
+        self.params['port_list'], unit, index, self.params['port_step'],
+      ),
+    }
+    if 'main_pid' in params and params['main_pid'] is None:
+      params['main_pid'] = int(ServiceStatus(
+        unit,
+        self.run_command,
+        self.systemctl,
+        properties=PROBE_PROPERTIES,
+      ).get('MainPID') or 0)
+    return params
+
+  def run_unit(self, run_one: Callable[[dict], dict], unit: str, index: int) -> None:
+    params = self.instance_params(unit, index)
+    try:
+      result = run_one(params)
+    except LaunchError as e:
+      result = {'failed': True, **e.result}
+    self.results[unit] = result
+    if result.get('failed') or (
+      # checks return below required_checks instead of failing, instance is not ready
+      'main_pid' in params
+      and result.get('passed_checks', 0) < params['required_checks']
+    ):
+      self.failed.append(unit)
+
+  def run(self, run_one: Callable[[dict], dict]) -> dict:
+    started = time.time()
+    # syslog ident is per process, instances log under the pattern with their names
+    open_log(self.params['name'], self.params.get('epoch'))
+    with concurrent.futures.ThreadPoolExecutor(self.wave_size) as pool:
+      for first in range(0, len(self.units), self.wave_size):
+        wave = self.units[first:first + self.wave_size]
+        if len(self.failed) > self.failure_threshold:
+          self.skipped.extend(wave)
+          continue
+        self.waves.append(wave)
+        syslog.syslog(
+          syslog.LOG_INFO,
+          f'wave [{len(self.waves)}] units [{", ".join(wave)}], failed '
+          f'[{len(self.failed)}/{self.failure_threshold}] threshold',
+        )
+        futures = [
+          pool.submit(self.run_unit, run_one, unit, first + index)
+          for index, unit in enumerate(wave)
+        ]
+        for future in futures:
+          future.result()
+    syslog.closelog()
+    result = {
+      'changed': any(done.get('changed') for done in self.results.values()),
+      'units': self.units,
+      'instances': {
+        unit: self.results[unit] for unit in self.units if unit in self.results
+      },
+      'waves': self.waves,
+      'passed': len(self.results) - len(self.failed),
+      'failed_units': sorted(self.failed, key=natural_key),
+      'skipped_units': self.skipped,
+      'elapsed': round(time.time() - started, 3),
+    }
+    if len(self.failed) > self.failure_threshold:
+      msg = (
+        f'[{len(self.failed)}] of [{len(self.units)}] instances failed, more than '
+        f'failure_threshold [{self.failure_threshold}]'
+      )
+      raise LaunchError(msg, **result)
+    return result
+
+
+def cli_parser() -> argparse.ArgumentParser:
+  parser = argparse.ArgumentParser(
+    prog='mega_launch',
+    description='start systemd unit or check it is ready, print JSON result',
+  )
+  commands = parser.add_subparsers(dest='command')
+  commands.required = True
+  launch = commands.add_parser('launch', help='start unit with rescues until ready')
+  check = commands.add_parser('check', help='check ports and log of running unit')
+  for command in (launch, check):
+    command.add_argument('name', help='systemd unit name, template or glob pattern')
+    command.add_argument('--port', dest='port_list', type=int, action='append')
+    command.add_argument('--log-regexp')
+    command.add_argument('--log-fail-regexp', action='append')
+    command.add_argument('--log-fail-fatal', action='store_true')
+    command.add_argument('--log-file', action='append')
+    command.add_argument('--notify-ready', action='store_true')
+    command.add_argument('--status-regexp')
+    command.add_argument('--wait-timeout', type=int)
+    command.add_argument('--retry-delay', type=int)
+    command.add_argument('--required-checks', type=int)
+    command.add_argument('--instance', dest='instances', action='append')
+    command.add_argument('--port-step', type=int)
+    command.add_argument('--wave-size', type=int)
+    command.add_argument('--failure-threshold', type=int)
+  launch.add_argument('--max-rescues', type=int)
+  launch.add_argument('--rescue-delay', type=int)
+  launch.add_argument('--rescue-backoff', choices=RescueBackoff.STRATEGIES)
+  launch.add_argument('--rescue-delay-max', type=int)
+  launch.add_argument('--settle-cpu', type=float)
+  launch.add_argument('--settle-io', type=int)
+  launch.add_argument('--settle-duration', type=int)
+  launch.add_argument('--warmup-path', dest='warmup_paths', action='append')
+  launch.add_argument('--warmup-budget', type=int)
+  launch.add_argument('--warmup-workers', type=int)
+  launch.add_argument('--warmup-method', choices=('fadvise', 'read'))
+  launch.add_argument('--warmup-timeout', type=int)
+  launch.add_argument('--verdict-ttl', type=int)
+  launch.add_argument('--verdict-dir')
+  launch.add_argument('--state', choices=('started', 'restarted'))
+  launch.add_argument('--no-block', action='store_true')
+  launch.add_argument('--stop-timeout', type=int)
+  launch.add_argument('--murder-delay', type=int)
+  launch.add_argument('--epoch')
+  launch.add_argument('--scope', choices=('system', 'user', 'global'))
+  launch.add_argument('--check-mode', action='store_true')
+  check.add_argument('--main-pid', type=int)
+  check.add_argument('--log-epoch', type=int)
+  check.add_argument('--log-positions', type=json.loads)
+  return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+  options = vars(cli_parser().parse_args(argv))
+  command = options.pop('command')
+  check_mode = options.pop('check_mode', False)
+  params = {key: value for key, value in options.items() if value is not None}
+  systemctl = shutil.which('systemctl') or 'systemctl'
+  journalctl = shutil.which('journalctl') or 'journalctl'
+
+  def run_one(unit_params: dict) -> dict:
+    if command == 'check':
+      return Checker(unit_params, journalctl=journalctl, systemctl=systemctl).run()
+    return Launcher(
+      unit_params,
+      systemctl=systemctl,
+      journalctl=journalctl,
+      check_mode=check_mode,
+    ).run()
+
+  try:
+    if is_pattern(params['name'], params.get('instances')):
+      defaults = CHECK_DEFAULTS if command == 'check' else LAUNCH_DEFAULTS
+      result = WaveRunner({**defaults, **params}, systemctl=systemctl).run(run_one)
+    else:
+      result = run_one(params)
+  except LaunchError as e:
+    result = {'failed': True, **e.result}
+  sys.stdout.write(json.dumps(result, default=sorted) + '\n')
+  return 1 if result.get('failed') else 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
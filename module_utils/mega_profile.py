@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+  from ansible.module_utils.basic import AnsibleModule
+  from ansible.module_utils.mega_helper import (  # type: ignore[reportMissingImports]
+    HelperClient,
+  )
+
+PROFILE_ENV = 'MEGA_LAUNCH_PROFILE'
+PROFILE_SLOWEST = 10
+
+
+class ModuleProfiler:
+  def __init__(
+    self,
+    module: AnsibleModule,
+    path: str | None = None,
+    top: int = 20,
+  ) -> None:
+    self.module = module
+    self.path = path
+    self.top = top
+    self.commands: dict[str, dict] = {}
+    self.slowest: list[dict] = []
+    self.summary: dict | None = None
+    self.started = time.time()
+    self.lock = threading.Lock()
+    self.profile = cProfile.Profile()
+    self.thread_profiles: list[cProfile.Profile] = []
+    self.orig_run_command = module.run_command
+    self.orig_exit_json = module.exit_json
+    self.orig_fail_json = module.fail_json
+    module.run_command = self.run_command
+    module.exit_json = self.exit_json
+    module.fail_json = self.fail_json
+    if sys.version_info < (3, 12):
+      # cProfile before 3.12 hooks the calling thread only, wave threads get their own
+      threading.setprofile(self.profile_thread)
+    self.profile.enable()
+
+  @classmethod
+  def attach(cls, module: AnsibleModule) -> ModuleProfiler | None:
+    env = os.getenv(PROFILE_ENV, '')
+    path = module.params.get('profile_path')
+    if env.lower() not in {'', '0', 'false', 'no', '1', 'true', 'yes'}:
+      path = path or env
+    if not (module.params.get('profile') or path or env.lower() in {'1', 'true', 'yes'}):
+      return None
+    return cls(module, path=path, top=module.params.get('profile_top') or 20)
+
+  def profile_thread(self, *_: object) -> None:
+    sys.setprofile(None)
+    profile = cProfile.Profile()
+    self.thread_profiles.append(profile)
+    profile.enable()
+
+  def track(self, helper: HelperClient) -> None:
+    # commands run by helper daemon are timed like module run_command
+    orig_run_command = helper.run_command
+
+    def run_command(command: str) -> tuple[int, str, str] | None:
+      started = time.perf_counter()
+      response = orig_run_command(command)
+      self.record(
+        command,
+        time.perf_counter() - started,
+        response[0] if response else None,
+        via='helper ',
+      )
+      return response
+
+    helper.run_command = run_command
+
+  def record(self, command: str, elapsed: float, rc: int | None, via: str = '') -> None:
+    words = command.split()
+    key = via + ' '.join([
+      os.path.basename(words[0]),  # noqa: PTH119
+      *[word for word in words[1:] if not word.startswith('-')][:1],
+    ]) if words else ''
+    with self.lock:
+      stat = self.commands.setdefault(key, {'calls': 0, 'total': 0.0, 'max': 0.0})
+      stat['calls'] += 1
+      stat['total'] += elapsed
+      stat['max'] = max(stat['max'], elapsed)
+      self.slowest.append({'command': f'{via}{command}', 'elapsed': elapsed, 'rc': rc})
+      self.slowest.sort(key=lambda call: -call['elapsed'])
+      del self.slowest[PROFILE_SLOWEST:]
+
+  def run_command(
+    self,
+    args: str | list[str],
+    *posargs: object,
+    **kwargs: object,
+  ) -> tuple:
+    command = args if isinstance(args, str) else ' '.join(f'{arg}' for arg in args)
+    started = time.perf_counter()
+    response = self.orig_run_command(args, *posargs, **kwargs)
+    self.record(command, time.perf_counter() - started, response[0])
+    return response
+
+  def finish(self) -> dict:
+    if self.summary is not None:
+      return self.summary
+    self.profile.disable()
+    threading.setprofile(None)  # type: ignore[arg-type]
+    stream = io.StringIO()
+    stats = pstats.Stats(self.profile, *self.thread_profiles, stream=stream)
+    stats.sort_stats('cumulative').print_stats(self.top)
+    error = None
+    if self.path:
+      # unwritable dump path must not lose result of already started service
+      try:
+        stats.dump_stats(self.path)
+      except OSError as e:
+        error = f'Unable to write profile to [{self.path}]: {e}'
+    self.summary = {
+      'elapsed': round(time.time() - self.started, 3),
+      'path': self.path if error is None else None,
+      'error': error,
+      'top': [line for line in stream.getvalue().split('\n') if line.strip()],
+      'commands': {
+        key: {
+          'calls': stat['calls'],
+          'total': round(stat['total'], 3),
+          'max': round(stat['max'], 3),
+        }
+        for key, stat in self.commands.items()
+      },
+      'slowest': [
+        {**call, 'elapsed': round(call['elapsed'], 3)} for call in self.slowest
+      ],
+    }
+    return self.summary
+
+  def exit_json(self, **kwargs: object) -> None:
+    kwargs['profile'] = self.finish()
+    self.orig_exit_json(**kwargs)
+
+  def fail_json(self, msg: str | None = None, **kwargs: object) -> None:
+    kwargs['profile'] = self.finish()
+    if msg is not None:
+      kwargs['msg'] = msg
+    self.orig_fail_json(**kwargs)
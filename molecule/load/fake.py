@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+# Stand-in for systemctl and journalctl driven by scenario state in MEGA_FAKE_STATE
+from __future__ import annotations
+
+import contextlib
+import fcntl
+import fnmatch
+import json
+import math
+import os
+import sys
+import time
+from pathlib import Path
+
+STATE = Path(os.getenv('MEGA_FAKE_STATE', '/tmp/mega-fake'))  # noqa: S108
+HOST = 'fake'
+PID_BASE = 100000
+FLOOD_SPAN = 3600.0
+TAIL_SPAN = 60.0
+BUSY_IO = 2**20
+DEFAULTS = {
+  'type': 'simple',
+  'start_delay': 0.0,
+  'ready_after': 1.0,
+  'crash_after': None,
+  'crash_starts': 0,
+  'log_rate': 1.0,
+  'log_lines': 0,
+  'ready_line': 'committed state height=100 module=state',
+  'noise_line': 'received proposal height=99 module=consensus',
+  'fail_line': None,
+  'status_text': 'replaying blocks',
+  'ready_status': 'ready',
+  'ports': [],
+  'busy_cpu': 0.9,
+  'idle_cpu': 0.01,
+}
+
+
+@contextlib.contextmanager
+def unit_state(unit: str, write: bool = False):  # noqa: ANN201,FBT001,FBT002
+  path = STATE / 'units' / f'{unit}.json'
+  if not path.exists():
+    # empty state of missing unit keeps callers free of Optional checks
+    yield {}
+    return
+  with path.open('r+', encoding='utf-8') as f:
+    fcntl.flock(f, fcntl.LOCK_EX if write else fcntl.LOCK_SH)
+    state = json.load(f)
+    state['behaviour'] = {**DEFAULTS, **state.get('behaviour', {})}
+    yield state
+    if write:
+      f.seek(0)
+      f.truncate()
+      json.dump(state, f)
+
+
+def unit_name(name: str) -> str:
+  return name[:-len('.service')] if name.endswith('.service') else name
+
+
+def current(state: dict, now: float) -> dict:
+  behaviour = state['behaviour']
+  runs = state.get('runs', [])
+  info = {
+    'ActiveState': 'inactive',
+    'SubState': 'dead',
+    'MainPID': '0',
+    'Result': 'success',
+    'StatusText': '',
+    'InvocationID': '',
+    'Job': '',
+    'ready': False,
+    'run': {},
+  }
+  if not runs or runs[-1].get('end') is not None:
+    if runs and runs[-1].get('crashed'):
+      info.update({'ActiveState': 'failed', 'SubState': 'failed', 'Result': 'exit-code'})
+    return info
+  run = runs[-1]
+  crash_at = crash_time(state, len(runs) - 1)
+  if crash_at is not None and now >= crash_at:
+    info.update({'ActiveState': 'failed', 'SubState': 'failed', 'Result': 'exit-code'})
+    return info
+  ready = now >= run['start'] + behaviour['ready_after']
+  # --no-block start keeps the job queued for as long as blocking start would wait
+  job = now < run.get('job_until', 0)
+  activating = (behaviour['type'] == 'notify' and not ready) or job
+  info.update({
+    'ActiveState': 'activating' if activating else 'active',
+    'SubState': 'start' if activating else 'running',
+    'MainPID': f'{run["pid"]}' if behaviour['type'] == 'notify' or not job else '0',
+    'Job': f'{run["pid"]} start' if job else '',
+    'StatusText': behaviour['ready_status'] if ready else behaviour['status_text'],
+    'InvocationID': run['invocation'],
+    'ready': ready,
+    'run': run,
+  })
+  return info
+
+
+def crash_time(state: dict, index: int) -> float | None:
+  behaviour = state['behaviour']
+  crash_starts = behaviour['crash_starts']
+  if behaviour['crash_after'] is None or (0 <= crash_starts <= index):
+    return None
+  return state['runs'][index]['start'] + behaviour['crash_after']
+
+
+def systemctl_show(unit: str, properties: list[str]) -> int:
+  with unit_state(unit) as state:
+    if not state:
+      print(f'Id={unit}.service\nLoadState=not-found\nActiveState=inactive')  # noqa: T201
+      return 0
+    info = current(state, time.time())
+    values = {
+      'Id': f'{unit}.service',
+      'Names': f'{unit}.service',
+      'LoadState': 'loaded',
+      'UnitFileState': 'enabled',
+      'Type': state['behaviour']['type'],
+      'ActiveState': info['ActiveState'],
+      'SubState': info['SubState'],
+      'MainPID': info['MainPID'],
+      'Result': info['Result'],
+      'StatusText': info['StatusText'],
+      'InvocationID': info['InvocationID'],
+      'ControlGroup': f'/system.slice/{unit}.service',
+      'Job': info['Job'],
+    }
+  for key, value in values.items():
+    if not properties or key in properties:
+      print(f'{key}={value}')  # noqa: T201
+  return 0
+
+
+def systemctl_start(unit: str, no_block: bool = False) -> int:  # noqa: FBT001,FBT002
+  with unit_state(unit, write=True) as state:
+    if not state:
+      print(f'Unit {unit}.service not found.', file=sys.stderr)  # noqa: T201
+      return 5
+    now = time.time()
+    info = current(state, now)
+    runs = state.setdefault('runs', [])
+    if not info['run']:
+      if runs and runs[-1].get('end') is None:
+        runs[-1]['end'] = crash_time(state, len(runs) - 1)
+        runs[-1]['crashed'] = True
+      runs.append({
+        'start': now,
+        'end': None,
+        'pid': PID_BASE + state['index'] * 100 + len(runs),
+        'invocation': f'{state["index"]:08x}{len(runs):024x}',
+      })
+    behaviour = state['behaviour']
+    delay = behaviour['start_delay']
+    if behaviour['type'] == 'notify':
+      delay = max(delay, behaviour['ready_after'])
+    if no_block and not info['run']:
+      runs[-1]['job_until'] = now + delay
+  time.sleep(0.0 if no_block else delay)
+  return 0
+
+
+def systemctl_stop(unit: str) -> int:
+  with unit_state(unit, write=True) as state:
+    if not state:
+      return 5
+    runs = state.get('runs', [])
+    if runs and runs[-1].get('end') is None:
+      now = time.time()
+      crash_at = crash_time(state, len(runs) - 1)
+      runs[-1]['end'] = min(now, crash_at) if crash_at is not None else now
+      runs[-1]['crashed'] = crash_at is not None and crash_at <= now
+  return 0
+
+
+def systemctl(args: list[str]) -> int:  # noqa: C901,PLR0911,PLR0912
+  properties: list[str] = []
+  words: list[str] = []
+  iterator = iter(args)
+  for arg in iterator:
+    if arg == '-p':
+      properties.extend(next(iterator, '').split(','))
+    elif arg.startswith('--property='):
+      properties.extend(arg.split('=', 1)[1].split(','))
+    elif not arg.startswith('-'):
+      words.append(arg)
+  no_block = '--no-block' in args
+  if not words:
+    return 0
+  verb, units = words[0], [unit_name(unit) for unit in words[1:]]
+  if verb == 'show':
+    return max((systemctl_show(unit, properties) for unit in units), default=0)
+  if verb in {'start', 'restart'}:
+    if verb == 'restart':
+      for unit in units:
+        systemctl_stop(unit)
+    return max((systemctl_start(unit, no_block) for unit in units), default=0)
+  if verb == 'stop':
+    return max((systemctl_stop(unit) for unit in units), default=0)
+  if verb == 'is-active':
+    with unit_state(units[0]) as state:
+      active = state and current(state, time.time())['ActiveState']
+    print(active or 'inactive')  # noqa: T201
+    return 0 if active == 'active' else 3
+  if verb == 'is-enabled':
+    print('enabled')  # noqa: T201
+    return 0
+  if verb in {'list-units', 'list-unit-files'}:
+    for path in sorted((STATE / 'units').glob('*.json')):
+      if words[1:] and not any(
+        fnmatch.fnmatchcase(f'{path.stem}.service', pattern) for pattern in words[1:]
+      ):
+        continue
+      print(f'{path.stem}.service loaded active running {path.stem}')  # noqa: T201
+    return 0
+  return 0
+
+
+def journal_format(ts: float, unit: str, pid: int, message: str, output: str) -> str:
+  if output == 'cat':
+    return message
+  stamp = time.strftime(
+    '%Y-%m-%dT%H:%M:%S%z' if output == 'short-iso' else '%b %d %H:%M:%S',
+    time.localtime(ts),
+  )
+  return f'{stamp} {HOST} {unit}[{pid}]: {message}'
+
+
+def journal_entries(state: dict, since: float, until: float) -> list[tuple]:
+  behaviour = state['behaviour']
+  entries: list[tuple] = []
+  flood = behaviour['log_lines']
+  if flood:
+    base = state['epoch'] - FLOOD_SPAN
+    step = FLOOD_SPAN / flood
+    first = max(math.floor((since - base) / step) + 1, 0)
+    entries.extend(
+      (base + index * step, PID_BASE, behaviour['noise_line'])
+      for index in range(first, flood)
+      if base + index * step <= until
+    )
+  for index, run in enumerate(state.get('runs', [])):
+    end = min(
+      value for value in (
+        until,
+        run.get('end') or until,
+        crash_time(state, index) or until,
+      )
+    )
+    rate = behaviour['log_rate']
+    if rate > 0:
+      first = max(math.floor((since - run['start']) * rate) + 1, 0)
+      last = math.floor((end - run['start']) * rate)
+      entries.extend(
+        (run['start'] + tick / rate, run['pid'], behaviour['noise_line'])
+        for tick in range(first, last + 1)
+      )
+    ready_at = run['start'] + behaviour['ready_after']
+    if since < ready_at <= end:
+      entries.append((ready_at + 1e-6, run['pid'], behaviour['ready_line']))
+    crash_at = crash_time(state, index)
+    if behaviour['fail_line'] and crash_at is not None and since < crash_at <= end:
+      entries.append((crash_at - 1e-6, run['pid'], behaviour['fail_line']))
+  entries.sort()
+  return entries
+
+
+def parse_since(value: str) -> float:
+  if value.startswith('@'):
+    return float(value[1:])
+  return time.mktime(time.strptime(value, '%Y-%m-%d %H:%M:%S'))
+
+
+def journalctl(args: list[str]) -> int:
+  options: dict[str, str] = {}
+  flags: set[str] = set()
+  iterator = iter(args)
+  for arg in iterator:
+    if arg in {'-t', '-S', '-o', '-n', '-u'}:
+      options[arg] = next(iterator, '')
+    elif arg.startswith('--after-cursor='):
+      options['cursor'] = arg.split('=', 1)[1]
+    else:
+      flags.add(arg)
+  unit = unit_name(options.get('-t') or options.get('-u') or '')
+  until = time.time()
+  # tail reads without window look back TAIL_SPAN only to keep floods cheap
+  since = float(options['cursor']) if 'cursor' in options else (
+    parse_since(options['-S']) if '-S' in options else
+    until - TAIL_SPAN if '-n' in options else 0.0
+  )
+  output = options.get('-o', 'short')
+  with unit_state(unit) as state:
+    entries = journal_entries(state, since, until) if state else []
+  if '-n' in options:
+    entries = entries[-int(options['-n']):] if int(options['-n']) else []
+  lines = [
+    journal_format(ts, unit, pid, message, output) for ts, pid, message in entries
+  ]
+  if lines:
+    sys.stdout.write('\n'.join(lines) + '\n')
+  elif '-q' not in flags:
+    sys.stdout.write('-- No entries --\n')
+  if '--show-cursor' in flags and entries:
+    sys.stdout.write(f'-- cursor: {entries[-1][0]:.6f}\n')
+  return 0
+
+
+if __name__ == '__main__':
+  command = Path(sys.argv[0]).name
+  sys.exit(
+    journalctl(sys.argv[1:]) if command == 'journalctl' else systemctl(sys.argv[1:]),
+  )
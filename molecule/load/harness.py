@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# Drives role modules end-to-end against fake systemctl/journalctl per scenario
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import json
+import os
+import shutil
+import subprocess  # noqa: S404
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+RUSAGE_KB = 1024 if sys.platform != 'darwin' else 1
+
+
+def run_module(env: dict, module: str, args: dict, workdir: Path) -> dict:
+  args_path = workdir / f'args-{os.getpid()}-{time.perf_counter_ns()}.json'
+  args_path.write_text(json.dumps({'ANSIBLE_MODULE_ARGS': args}), encoding='utf-8')
+  out_path = args_path.with_suffix('.out')
+  err_path = args_path.with_suffix('.err')
+  started = time.perf_counter()
+  with out_path.open('wb') as out, err_path.open('wb') as err:
+    # reap with wait4 directly to get rusage of this module run only
+    proc = subprocess.Popen(  # noqa: S603
+      [sys.executable, f'{HERE / "runner.py"}', module, f'{args_path}'],
+      env=env,
+      stdout=out,
+      stderr=err,
+    )
+    _, status, usage = os.wait4(proc.pid, 0)
+  wall = time.perf_counter() - started
+  proc.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -1
+  try:
+    result = json.loads(
+      out_path.read_text(encoding='utf-8').strip().split('\n')[-1],
+    )
+  except ValueError:
+    result = {'failed': True, 'msg': err_path.read_text(encoding='utf-8')[-500:]}
+  return {
+    'wall': wall,
+    'cpu': usage.ru_utime + usage.ru_stime,
+    'rss': usage.ru_maxrss * RUSAGE_KB,
+    'failed': bool(result.get('failed')) or proc.returncode != 0,
+    'result': result,
+  }
+
+
+def lookup(result: dict, key: str) -> object:
+  # dotted keys reach into nested result dicts like warmup.bytes
+  value: object = result
+  for part in key.split('.'):
+    value = value.get(part) if isinstance(value, dict) else None
+  return value
+
+
+class Scenario:
+  def __init__(self, spec: dict, workdir: Path) -> None:
+    self.spec = spec
+    self.name = spec['name']
+    self.workdir = workdir
+    self.state = workdir / 'state'
+    self.async_dir = workdir / 'async'
+    self.units = spec.get('units') or [
+      spec.get('unit', 'gaiad') if spec.get('count', 1) == 1 else
+      f'{spec.get("unit", "gaiad")}-{index}'
+      for index in range(spec.get('count', 1))
+    ]
+    # pattern scenarios run every step once for all units
+    self.targets = [spec['target']] if 'target' in spec else self.units
+    self.results: list[dict] = []
+
+  def env(self) -> dict:
+    bin_dir = self.workdir / 'bin'
+    return {
+      **os.environ,
+      'PATH': f'{bin_dir}{os.pathsep}{os.environ.get("PATH", "")}',
+      'MEGA_FAKE_STATE': f'{self.state}',
+      'XDG_RUNTIME_DIR': f'{self.workdir}',
+      'ANSIBLE_ASYNC_DIR': f'{self.async_dir}',
+    }
+
+  def prepare(self) -> None:
+    bin_dir = self.workdir / 'bin'
+    for path in (bin_dir, self.state / 'units', self.async_dir):
+      path.mkdir(parents=True, exist_ok=True)
+    for command in ('systemctl', 'journalctl'):
+      (bin_dir / command).symlink_to(HERE / 'fake.py')
+    epoch = time.time()
+    for index, unit in enumerate(self.units):
+      instance = unit.partition('@')[2]
+      (self.state / 'units' / f'{unit}.json').write_text(
+        json.dumps({
+          'index': index,
+          'epoch': epoch,
+          'behaviour': {
+            **self.spec.get('behaviour', {}),
+            **self.spec.get('unit_behaviour', {}).get(unit, {}),
+          },
+          'port_offset': int(instance) * self.spec.get('port_step', 0)
+          if instance.isdigit() else 0,
+          'runs': [],
+        }),
+        encoding='utf-8',
+      )
+    for name, size in self.spec.get('files', {}).items():
+      path = self.workdir / name
+      path.parent.mkdir(parents=True, exist_ok=True)
+      with path.open('wb') as file:
+        file.truncate(size)
+    if 'log_lines' in self.spec:
+      for unit in self.units:
+        self.log_path(unit).write_text(
+          ''.join(f'{line}\n' for line in self.spec['log_lines']),
+          encoding='utf-8',
+        )
+    if self.spec.get('sockets'):
+      (self.state / 'sockets.json').write_text(
+        json.dumps(self.spec['sockets']),
+        encoding='utf-8',
+      )
+    if self.spec.get('running'):
+      for unit in self.units:
+        subprocess.run(  # noqa: S603
+          [f'{bin_dir / "systemctl"}', 'start', unit],
+          env=self.env(),
+          check=True,
+        )
+
+  def log_path(self, unit: str) -> Path:
+    return self.workdir / self.spec.get('log_file', '{unit}.log').replace('{unit}', unit)
+
+  def write_log(self, unit: str, writes: list[dict]) -> None:
+    # scripted writes relative to step start: append lines, rotate or truncate file
+    path = self.log_path(unit)
+    started = time.monotonic()
+    for write in writes:
+      time.sleep(max(0, started + write.get('at', 0) - time.monotonic()))
+      if write.get('truncate'):
+        path.write_text('', encoding='utf-8')
+      with path.open('a', encoding='utf-8') as log:
+        log.writelines(f'{line}\n' for line in write.get('lines', []))
+      if write.get('rotate'):
+        path.replace(path.with_name(f'{path.name}.1'))
+        path.touch()
+
+  def substitute(self, value: object, unit: str, previous: dict) -> object:
+    if isinstance(value, list):
+      return [self.substitute(item, unit, previous) for item in value]
+    if not isinstance(value, str):
+      return value
+    if value.startswith('{previous:'):
+      return previous.get('result', {}).get(value[len('{previous:'):-1])
+    return value.replace('{unit}', unit).replace('{workdir}', f'{self.workdir}')
+
+  def step_args(self, step: dict, unit: str, previous: dict) -> dict:
+    args = {
+      key: self.substitute(value, unit, previous)
+      for key, value in step.get('args', {}).items()
+    }
+    args.setdefault('name', unit)
+    if step['module'] == 'check_service':
+      args.setdefault('log_epoch', int(time.time()))
+    if step['module'] == 'mega_status':
+      jid = f'{unit}.{len(self.results)}'
+      (self.async_dir / jid).write_text(
+        json.dumps({**previous.get('result', {}), 'started': 1, 'finished': 1}),
+        encoding='utf-8',
+      )
+      args.update({'jid': jid, '_async_dir': f'{self.async_dir}'})
+    args['_ansible_check_mode'] = self.spec.get('check_mode', False)
+    return args
+
+  def run_unit(self, unit: str) -> list[dict]:
+    previous: dict = {}
+    runs = []
+    for step in self.spec['steps']:
+      args = self.step_args(step, unit, previous)
+      with concurrent.futures.ThreadPoolExecutor(1) as writer:
+        writing = writer.submit(self.write_log, unit, step.get('log_writes', []))
+        previous = run_module(self.env(), step['module'], args, self.workdir)
+        writing.result()
+      runs.append({
+        'unit': unit,
+        'module': step['module'],
+        'expect_failed': step.get(
+          'expect_failed',
+          self.spec.get('expect_failed', {}).get(step['module'], False),
+        ),
+        'expect_msg': step.get(
+          'expect_msg',
+          self.spec.get('expect_msg', {}).get(step['module'], ''),
+        ),
+        'mismatch': [
+          f'{key} [{lookup(previous["result"], key)}] expected [{value}]'
+          for key, value in step.get('expect', {}).items()
+          if lookup(previous['result'], key) != value
+        ] + [
+          f'{key} [{lookup(previous["result"], key)}] expected not empty'
+          for key in step.get('expect_filled', [])
+          if not lookup(previous['result'], key)
+        ],
+        **previous,
+      })
+    return runs
+
+  def run(self) -> list[dict]:
+    self.prepare()
+    with concurrent.futures.ThreadPoolExecutor(self.spec.get('parallel', 1)) as pool:
+      for runs in pool.map(self.run_unit, self.targets):
+        self.results.extend(runs)
+    return self.report()
+
+  def report(self) -> list[dict]:
+    rows = []
+    for module in dict.fromkeys(run['module'] for run in self.results):
+      runs = [run for run in self.results if run['module'] == module]
+      walls = sorted(run['wall'] for run in runs)
+      failed = sum(run['failed'] for run in runs)
+      rows.append({
+        'scenario': self.name,
+        'module': module,
+        'runs': len(runs),
+        'failed': failed,
+        'ok': all(
+          run['failed'] == run['expect_failed']
+          and run['expect_msg'] in f'{run["result"].get("msg", "")}'
+          and not run['mismatch']
+          for run in runs
+        ),
+        'wall_p50': round(walls[len(walls) // 2], 3),
+        'wall_max': round(walls[-1], 3),
+        'cpu': round(sum(run['cpu'] for run in runs), 3),
+        'peak_rss_mb': round(max(run['rss'] for run in runs) / 2**20, 1),
+        'errors': sorted({
+          f'{run["result"].get("msg", "")}'[:200] for run in runs
+          if run['failed'] != run['expect_failed']
+          or run['expect_msg'] not in f'{run["result"].get("msg", "")}'
+        } | {mismatch for run in runs for mismatch in run['mismatch']}),
+      })
+    return rows
+
+
+def main() -> int:
+  parser = argparse.ArgumentParser(
+    description='run role modules against fake systemctl/journalctl scenarios',
+  )
+  parser.add_argument('--scenarios', default=f'{HERE / "scenarios.json"}')
+  parser.add_argument('--only', nargs='*', default=[])
+  parser.add_argument('--json', dest='json_path')
+  parser.add_argument('--keep', action='store_true')
+  options = parser.parse_args()
+  specs = json.loads(Path(options.scenarios).read_text(encoding='utf-8'))
+  rows = []
+  for spec in specs:
+    if options.only and spec['name'] not in options.only:
+      continue
+    workdir = Path(tempfile.mkdtemp(prefix=f'mega-load-{spec["name"]}-'))
+    try:
+      rows.extend(Scenario(spec, workdir).run())
+    finally:
+      if not options.keep:
+        shutil.rmtree(workdir, ignore_errors=True)
+  header = (
+    'scenario',
+    'module',
+    'runs',
+    'failed',
+    'ok',
+    'wall_p50',
+    'wall_max',
+    'cpu',
+    'peak_rss_mb',
+  )
+  print(' '.join(f'{name:>14}' for name in header))  # noqa: T201
+  for row in rows:
+    print(' '.join(f'{row[name]!s:>14}' for name in header))  # noqa: T201
+    for error in row['errors']:
+      print(f'{"":>14} {error}')  # noqa: T201
+  if options.json_path:
+    Path(options.json_path).write_text(json.dumps(rows, indent=2), encoding='utf-8')
+  return 0 if all(row['ok'] for row in rows) else 1
+
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# Runs role module with arguments file as AnsiballZ would, psutil sees fake listeners
+from __future__ import annotations
+
+import json
+import os
+import runpy
+import sys
+from pathlib import Path
+from typing import NamedTuple
+
+# pylint: disable=import-error
+import ansible.module_utils  # type: ignore[reportMissingImports]
+import psutil  # type: ignore[reportMissingImports]
+
+HERE = Path(__file__).resolve().parent
+ROLE = HERE.parents[1]
+sys.path.insert(0, f'{HERE}')
+import fake  # type: ignore[reportMissingImports]
+
+
+class Addr(NamedTuple):
+  ip: str
+  port: int
+
+
+class CpuTimes(NamedTuple):
+  user: float
+  system: float
+
+
+class IoCounters(NamedTuple):
+  read_bytes: int
+  write_bytes: int
+
+
+class Conn(NamedTuple):
+  fd: int
+  family: int
+  type: int
+  laddr: Addr
+  raddr: Addr | tuple
+  status: str
+  pid: int | None
+
+
+def unit_states() -> list[dict]:
+  states = []
+  for path in sorted((fake.STATE / 'units').glob('*.json')):
+    with fake.unit_state(path.stem) as state:
+      if state:
+        states.append(state)
+  return states
+
+
+def listeners() -> list[Conn]:
+  conns = []
+  for state in unit_states():
+    info = fake.current(state, fake.time.time())
+    if info['ready']:
+      pid = int(info['MainPID'])
+      conns.extend(
+        Conn(
+          -1, 2, 1, Addr('0.0.0.0', port + state.get('port_offset', 0)), (),  # noqa: S104
+          psutil.CONN_LISTEN, pid,
+        )
+        for port in state['behaviour']['ports']
+      )
+  sockets = fake.STATE / 'sockets.json'
+  if sockets.exists():
+    noise = json.loads(sockets.read_text(encoding='utf-8'))
+    conns.extend(
+      Conn(
+        -1, 2, 1, Addr('10.0.0.1', 10000 + index % 50000), Addr('10.0.0.2', 443),
+        psutil.CONN_LISTEN if index % 2 else psutil.CONN_ESTABLISHED, None,
+      )
+      for index in range(noise)
+    )
+  return conns
+
+
+def busy_seconds(pid: int) -> float:
+  # unit is busy until ready then calms down to idle load
+  for state in unit_states():
+    info = fake.current(state, fake.time.time())
+    if int(info['MainPID']) == pid:
+      behaviour = state['behaviour']
+      elapsed = fake.time.time() - info['run']['start']
+      ready_after = behaviour['ready_after']
+      return min(elapsed, ready_after) * behaviour['busy_cpu'] + max(
+        elapsed - ready_after, 0,
+      ) * behaviour['idle_cpu']
+  return 0.0
+
+
+def running_pids() -> set[int]:
+  return {
+    int(fake.current(state, fake.time.time())['MainPID']) for state in unit_states()
+  } - {0}
+
+
+class FakeProcess:
+  def __init__(self, pid: int | None = None) -> None:
+    self.pid = os.getpid() if pid is None else pid
+    if pid is not None and pid not in running_pids():
+      raise psutil.NoSuchProcess(pid)
+
+  def connections(self, kind: str = 'inet') -> list[Conn]:  # noqa: ARG002
+    return [conn for conn in listeners() if conn.pid == self.pid]
+
+  net_connections = connections
+
+  def cpu_times(self) -> CpuTimes:
+    return CpuTimes(busy_seconds(self.pid), 0.0)
+
+  def io_counters(self) -> IoCounters:
+    return IoCounters(int(busy_seconds(self.pid) * fake.BUSY_IO), 0)
+
+  def is_running(self) -> bool:
+    return self.pid in running_pids()
+
+  def wait(self, timeout: float | None = None) -> None:
+    deadline = fake.time.time() + (timeout or 0)
+    while self.is_running():
+      if fake.time.time() >= deadline:
+        raise psutil.TimeoutExpired(timeout, self.pid)
+      fake.time.sleep(0.05)
+
+  def send_signal(self, sig: int) -> None:  # noqa: ARG002
+    if not self.is_running():
+      raise psutil.NoSuchProcess(self.pid)
+
+  @staticmethod
+  def children(recursive: bool = False) -> list:  # noqa: ARG004,FBT001,FBT002
+    return []
+
+
+psutil.Process = FakeProcess
+psutil.net_connections = lambda kind='inet': listeners()  # noqa: ARG005
+psutil.pid_exists = lambda pid: pid in running_pids()
+ansible.module_utils.__path__.append(f'{ROLE / "module_utils"}')
+
+if __name__ == '__main__':
+  module_path = f'{ROLE / "library" / sys.argv[1]}.py'
+  sys.argv = [module_path, *sys.argv[2:]]
+  runpy.run_path(module_path, run_name='__main__')